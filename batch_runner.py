@@ -0,0 +1,520 @@
+import argparse
+import csv
+import datetime
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import boilerplate
+import candidate_validator
+import core_logic
+import crawler
+import duplicate_index
+import job_queue
+import metrics
+import page_fingerprints
+import parse_pool
+import parser_backends
+import rate_limiter
+import streaming_extractor
+from fetch_cache import FetchCache
+from generation_cache import GenerationCache
+from history_store import HistoryStore
+from duplicate_index import DuplicateIndex
+from job_queue import JobQueue
+from page_fingerprints import FingerprintStore
+
+METRICS_WRITE_INTERVAL = 15 # seconds between refreshes of the --metrics file during a run
+
+# Options saved with a queued run and restored by --resume
+RUN_OPTIONS = ('instruction', 'keywords', 'tone', 'pages_per_request', 'crawl', 'follow_links', 'max_depth',
+               'max_pages', 'crawl_delay', 'ignore_robots', 'only_changed', 'streaming', 'no_repair', 'all_content')
+
+CSV_HEADER = ['日時', 'URL', 'パターン', 'タイトルタグ', '文字数', 'メタディスクリプション', '文字数', 'エラー']
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def iter_sitemap_urls(path):
+    # Stream <url><loc> entries so large sitemaps never sit in memory
+    for event, elem in ET.iterparse(path, events=('end',)):
+        name = _local_name(elem.tag)
+        if name == 'url':
+            for child in elem:
+                if _local_name(child.tag) == 'loc' and child.text:
+                    yield child.text.strip()
+            elem.clear()
+        elif name == 'sitemap':
+            # Sitemap indexes point at other sitemaps, not pages
+            elem.clear()
+
+def iter_csv_urls(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        url_col = 0
+        for i, row in enumerate(reader):
+            if not row:
+                continue
+            if i == 0:
+                lowered = [c.strip().lower() for c in row]
+                if 'url' in lowered:
+                    url_col = lowered.index('url')
+                    continue
+            if url_col < len(row) and row[url_col].strip():
+                yield row[url_col].strip()
+
+def iter_text_urls(path):
+    with open(path, encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+
+def load_urls(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.xml':
+        return iter_sitemap_urls(path)
+    if ext == '.csv':
+        return iter_csv_urls(path)
+    return iter_text_urls(path)
+
+class ResultWriter:
+    # Appends one record per URL and flushes immediately, so a crash loses at most the in-flight pages
+    def __init__(self, path):
+        self.path = path
+        self.format = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+        self._lock = threading.Lock()
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        if self.format == 'csv':
+            self._file = open(path, 'a', newline='', encoding='utf-8-sig' if is_new else 'utf-8')
+            self._csv = csv.writer(self._file)
+            if is_new:
+                self._csv.writerow(CSV_HEADER)
+        else:
+            self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, record):
+        with self._lock:
+            if self.format == 'csv':
+                if record.get('error'):
+                    self._csv.writerow([record['timestamp'], record['url'], '', '', '', '', '', record['error']])
+                for item in record.get('suggestions', []):
+                    title = item.get('title_tag', '')
+                    desc = item.get('description', '')
+                    self._csv.writerow([
+                        record['timestamp'],
+                        record['url'],
+                        item.get('title', ''),
+                        title,
+                        len(title),
+                        desc,
+                        len(desc),
+                        ''
+                    ])
+            else:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+def fetch_page(url, fetch_content, fingerprints=None):
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        page = {"url": url, "timestamp": timestamp, "website_text": fetch_content(url)}
+    except Exception as e:
+        return {"url": url, "timestamp": timestamp, "error": str(e)}
+    if fingerprints:
+        page['change'], page['fingerprint'] = fingerprints.classify(url, page['website_text'])
+    return page
+
+def generate_group(api_key, pages, global_instruction, target_keywords, tone, cache):
+    # pages: fetched records; returns finished records in the same order
+    records = []
+    if len(pages) == 1:
+        page = pages[0]
+        try:
+            suggestions = core_logic.generate_descriptions(
+                api_key,
+                core_logic.strip_site_boilerplate(page['url'], page['website_text']),
+                global_instruction,
+                target_keywords,
+                tone=tone,
+                cache=cache
+            )
+            records.append({"url": page['url'], "timestamp": page['timestamp'], "suggestions": suggestions})
+        except Exception as e:
+            records.append({"url": page['url'], "timestamp": page['timestamp'], "error": str(e)})
+        return records
+
+    results = core_logic.generate_descriptions_batch(
+        api_key,
+        {page['url']: core_logic.strip_site_boilerplate(page['url'], page['website_text']) for page in pages},
+        global_instruction,
+        target_keywords,
+        tone=tone,
+        cache=cache
+    )
+    for page in pages:
+        result = results.get(page['url'])
+        if isinstance(result, list):
+            records.append({"url": page['url'], "timestamp": page['timestamp'], "suggestions": result})
+        else:
+            records.append({"url": page['url'], "timestamp": page['timestamp'], "error": str(result)})
+    return records
+
+def run_batch(api_key, urls, output_path, global_instruction="", target_keywords="", tone="SEO重視",
+              concurrency=8, on_progress=None, fetch_content=None, cache=None, pages_per_request=1, history_store=None,
+              fingerprints=None, only_changed=False, queue=None, run_id=None, duplicates=None, discard=None):
+    # With a fingerprint store every fetched page is classified as new / changed / unchanged;
+    # only_changed skips generation for unchanged pages. Fingerprints are saved after a successful
+    # generation, so failed pages are retried on the next run.
+    # With a job queue every page's state is checkpointed under run_id: pages already generated
+    # in that run are skipped and pages with checkpointed text go straight to generation.
+    # With a duplicate index every generated description is checked against the rest of the site;
+    # records that resemble other pages get a 'duplicates' list.
+    # discard(url) is called for every URL that is skipped without a fetch (Crawler.take_body frees its kept body).
+    fetch_content = fetch_content or core_logic.fetch_website_content
+    writer = ResultWriter(output_path)
+    summary = {"total": 0, "succeeded": 0, "failed": 0, "skipped": 0, "already_generated": 0, "near_duplicates": 0}
+    seen = set() # URLs taken in this invocation (a resumed run reads the queue and then the original input)
+    new_fingerprints = {} # url -> fingerprint, saved once the page is generated
+    current_descriptions = {} # url -> the page's existing meta description, indexed with the generated ones
+    # Keep a bounded window of pages in flight so huge (or streamed) URL lists are consumed lazily
+    max_pending = max(concurrency * 2, pages_per_request)
+    pending = {}   # future -> 'fetch' | 'generate'
+    in_flight = 0  # pages fetching, waiting for a group, or generating
+    ready = []     # fetched pages waiting to fill a generation group
+
+    def finish(record):
+        summary["total"] += 1
+        fp = new_fingerprints.pop(record['url'], None)
+        current = current_descriptions.pop(record['url'], None)
+        if duplicates and record.get('suggestions'):
+            matches = duplicates.check(record['url'], [item.get('description', '') for item in record['suggestions']], current)
+            if matches:
+                record['duplicates'] = matches
+                summary["near_duplicates"] += 1
+        if queue:
+            if record.get('error'):
+                queue.mark_failed(run_id, record['url'], record['error'])
+            else:
+                queue.mark_generated(run_id, record['url'], record.get('suggestions', []))
+        if record.get('skipped'):
+            summary["skipped"] += 1
+        else:
+            writer.write(record)
+            if history_store and record.get('suggestions'):
+                history_store.add_entries(record['url'], record['suggestions'], record['timestamp'])
+            if record.get('error'):
+                summary["failed"] += 1
+            else:
+                summary["succeeded"] += 1
+                if fp:
+                    fingerprints.set(record['url'], fp)
+        if on_progress:
+            on_progress(record, summary)
+
+    def accept_fetched(page):
+        # Fetched (or checkpointed) pages either finish here or wait for a generation group
+        nonlocal in_flight
+        if page.get('error'):
+            in_flight -= 1
+            finish(page)
+        elif only_changed and page.get('change') == page_fingerprints.UNCHANGED:
+            in_flight -= 1
+            finish({"url": page['url'], "timestamp": page['timestamp'], "skipped": True})
+        else:
+            if page.get('fingerprint'):
+                new_fingerprints[page['url']] = page['fingerprint']
+            if duplicates:
+                current_descriptions[page['url']] = duplicate_index.current_description(page['website_text'])
+            ready.append(page)
+
+    def submit_group(executor):
+        group = ready[:pages_per_request]
+        del ready[:pages_per_request]
+        pending[executor.submit(
+            generate_group, api_key, group, global_instruction, target_keywords, tone, cache
+        )] = 'generate'
+
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            url_iter = iter(urls)
+            exhausted = False
+            while True:
+                while not exhausted and in_flight < max_pending:
+                    url = next(url_iter, None)
+                    if url is None:
+                        exhausted = True
+                        break
+                    if queue:
+                        if url in seen:
+                            if discard:
+                                discard(url)
+                            continue
+                        seen.add(url)
+                        item = queue.enqueue(run_id, url)
+                        if item['state'] == job_queue.GENERATED:
+                            summary["already_generated"] += 1
+                            if discard:
+                                discard(url)
+                            continue
+                        if item['website_text'] is not None:
+                            # Fetched before the interruption: reuse the checkpoint
+                            if discard:
+                                discard(url)
+                            page = {"url": url, "timestamp": item['timestamp'], "website_text": item['website_text']}
+                            if fingerprints:
+                                page['change'], page['fingerprint'] = fingerprints.classify(url, page['website_text'])
+                            in_flight += 1
+                            accept_fetched(page)
+                            continue
+                    pending[executor.submit(fetch_page, url, fetch_content, fingerprints)] = 'fetch'
+                    in_flight += 1
+                fetching = any(kind == 'fetch' for kind in pending.values())
+                # Flush a partial group once nothing else can fill it
+                while ready and (len(ready) >= pages_per_request or (exhausted and not fetching)):
+                    submit_group(executor)
+                if not pending:
+                    break
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind = pending.pop(future)
+                    if kind == 'fetch':
+                        page = future.result()
+                        if queue and not page.get('error'):
+                            queue.mark_fetched(run_id, page['url'], page['timestamp'], page['website_text'])
+                        accept_fetched(page)
+                    else:
+                        for record in future.result():
+                            in_flight -= 1
+                            finish(record)
+    finally:
+        writer.close()
+    return summary
+
+def print_progress(record, summary):
+    mark = "SKIP" if record.get('skipped') else "NG" if record.get('error') else "OK"
+    note = f" (類似: {', '.join(sorted({match['url'] for match in record['duplicates']}))})" if record.get('duplicates') else ""
+    print(f"[{summary['total']}] {mark} {record['url']}{note}", file=sys.stderr)
+
+def write_duplicate_report(duplicates, path):
+    clusters = duplicates.report()
+    duplicate_index.write_report(clusters, path)
+    pages = sum(cluster['pages'] for cluster in clusters)
+    print(f"類似説明文レポート: {len(clusters)}グループ / {pages}ページ -> {path}", file=sys.stderr)
+    return 0
+
+def print_stage_timings():
+    rows = metrics.registry.stage_summary()
+    if not rows:
+        return
+    print(f"{'ステージ':<24}{'回数':>8}{'合計(秒)':>12}{'平均(ms)':>12}{'p95(ms)':>12}{'p99(ms)':>12}", file=sys.stderr)
+    for row in rows:
+        print(f"{row['stage']:<24}{row['count']:>8}{row['total']:>12.2f}{row['avg'] * 1000:>12.1f}"
+              f"{row['p95'] * 1000:>12.1f}{row['p99'] * 1000:>12.1f}", file=sys.stderr)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="URLリストからメタディスクリプションを一括生成します")
+    parser.add_argument("input", nargs="?", help="URLリスト (.txt / .csv / sitemap.xml)、または --crawl 時はサイトのURL")
+    parser.add_argument("-o", "--output", help="出力ファイル (.jsonl または .csv)")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"), help="Gemini APIキー (既定: 環境変数 GEMINI_API_KEY)")
+    parser.add_argument("--instruction", default="", help="サイト共通の指示")
+    parser.add_argument("--keywords", default="", help="ターゲットキーワード (カンマ区切り)")
+    parser.add_argument("--tone", default="SEO重視", help="トーン＆スタイル")
+    parser.add_argument("--concurrency", type=int, default=8, help="同時処理数")
+    parser.add_argument("--pages-per-request", type=int, default=1, help="1回のAPIリクエストにまとめるページ数")
+    parser.add_argument("--crawl", action="store_true", help="robots.txt / sitemap.xml からサイト内のURLを収集して処理する")
+    parser.add_argument("--follow-links", action="store_true", help="クロール時にサイト内リンクもたどる")
+    parser.add_argument("--max-depth", type=int, default=crawler.DEFAULT_MAX_DEPTH, help="リンクをたどる深さの上限")
+    parser.add_argument("--max-pages", type=int, default=crawler.DEFAULT_MAX_URLS, help="クロールで収集するURL数の上限")
+    parser.add_argument("--crawl-delay", type=float, default=crawler.DEFAULT_DELAY, help="同一ホストへのクロール間隔 (秒)")
+    parser.add_argument("--ignore-robots", action="store_true", help="robots.txt の Disallow を無視する")
+    parser.add_argument("--only-changed", action="store_true", help="前回の生成から内容が変わったページと新しいページのみ生成する")
+    parser.add_argument("--fingerprints", default=os.path.join(core_logic.APP_DATA_DIR, "fingerprints.sqlite3"), help="ページ内容のフィンガープリントDBのパス")
+    parser.add_argument("--no-fingerprints", action="store_true", help="ページ内容のフィンガープリントを記録しない")
+    parser.add_argument("--duplicates", default=os.path.join(core_logic.APP_DATA_DIR, "duplicates.sqlite3"), help="サイト内の類似説明文を検出するインデックスのパス")
+    parser.add_argument("--no-duplicates", action="store_true", help="類似説明文の検出を行わない")
+    parser.add_argument("--duplicate-report", metavar="CSV", help="類似説明文のグループをサイト全体でCSVに書き出す (input なしで実行するとレポートのみ作成)")
+    parser.add_argument("--streaming", action="store_true", help="必要な分だけ読み込んで打ち切るストリーミング抽出を使う (本文抽出は行わない)")
+    parser.add_argument("--boilerplate", default=os.path.join(core_logic.APP_DATA_DIR, "boilerplate.sqlite3"), help="サイト内で繰り返される定型ブロックを学習するDBのパス")
+    parser.add_argument("--all-content", action="store_true", help="ナビ・フッター等の定型部分を除外せず、ページのh1/h2/pをすべてプロンプトに含める")
+    parser.add_argument("--parser", choices=list(parser_backends.BACKENDS), help="HTMLパーサー (既定: 利用可能な最速のもの)")
+    parser.add_argument("--parse-workers", type=int, default=0, help="HTML解析を別プロセスで並列実行する数 (0: 取得スレッド内で解析)")
+    parser.add_argument("--no-repair", action="store_true", help="検証に不合格の候補を自動修正しない (検証と合格率の集計は行う)")
+    parser.add_argument("--rpm", type=int, default=rate_limiter.DEFAULT_REQUESTS_PER_MINUTE, help="Gemini API の1分あたりリクエスト上限")
+    parser.add_argument("--tpm", type=int, default=rate_limiter.DEFAULT_TOKENS_PER_MINUTE, help="Gemini API の1分あたりトークン上限")
+    parser.add_argument("--cache", default=os.path.join(core_logic.APP_DATA_DIR, "generation_cache.sqlite3"), help="生成結果キャッシュのパス")
+    parser.add_argument("--no-cache", action="store_true", help="生成結果キャッシュを使わない")
+    parser.add_argument("--history", default=os.path.join(core_logic.APP_DATA_DIR, "history.sqlite3"), help="生成履歴データベースのパス")
+    parser.add_argument("--no-history", action="store_true", help="生成履歴に記録しない")
+    parser.add_argument("--fetch-cache", default=os.path.join(core_logic.APP_DATA_DIR, "fetch_cache.sqlite3"), help="ETag/Last-Modified キャッシュのパス")
+    parser.add_argument("--no-fetch-cache", action="store_true", help="条件付きリクエストを使わず毎回全体を取得する")
+    parser.add_argument("--metrics", help="ステージ別の処理時間とカウンターをPrometheus形式で書き出すファイル (実行中も定期的に更新)")
+    parser.add_argument("--timings", action="store_true", help="終了時にステージ別の処理時間を表示する")
+    parser.add_argument("--queue", default=os.path.join(core_logic.APP_DATA_DIR, "job_queue.sqlite3"), help="進捗を記録するジョブキューのパス")
+    parser.add_argument("--no-queue", action="store_true", help="進捗を記録しない (中断後の再開ができなくなります)")
+    parser.add_argument("--resume", nargs="?", const="latest", metavar="RUN_ID", help="中断した実行を再開する (既定: 最新の実行)")
+    parser.add_argument("--list-runs", action="store_true", help="記録されている実行の一覧を表示する")
+    args = parser.parse_args(argv)
+
+    queue = None if args.no_queue else JobQueue(args.queue)
+    if args.list_runs:
+        if queue is None:
+            parser.error("--list-runs と --no-queue は同時に指定できません")
+        for run in queue.runs():
+            counts = queue.counts(run['id'])
+            print(f"#{run['id']} {run['created_at']} {run['input']} -> {run['output_path']} "
+                  f"(完了 {counts['generated']} / 取得済み {counts['fetched']} / 失敗 {counts['failed']} / 未処理 {counts['pending']})")
+        return 0
+
+    if args.duplicate_report and not args.input and not args.resume:
+        # Report only: from everything indexed so far (by earlier runs and the app)
+        if args.no_duplicates:
+            parser.error("--duplicate-report と --no-duplicates は同時に指定できません")
+        return write_duplicate_report(DuplicateIndex(args.duplicates), args.duplicate_report)
+
+    run = None
+    if args.resume:
+        if queue is None:
+            parser.error("--resume と --no-queue は同時に指定できません")
+        run = queue.latest_run() if args.resume == "latest" else queue.get_run(int(args.resume))
+        if run is None:
+            parser.error(f"再開する実行が見つかりません: {args.resume}")
+        args.input = run['input']
+        args.output = run['output_path']
+        for name, value in run['options'].items():
+            setattr(args, name, value)
+    elif not args.input or not args.output:
+        parser.error("入力と -o/--output を指定してください (中断した実行は --resume で再開できます)")
+
+    if not args.api_key:
+        parser.error("APIキーを --api-key または GEMINI_API_KEY で指定してください")
+
+    if args.streaming and args.parse_workers:
+        parser.error("--streaming と --parse-workers は同時に指定できません")
+    if args.only_changed and args.no_fingerprints:
+        parser.error("--only-changed と --no-fingerprints は同時に指定できません")
+    if args.duplicate_report and args.no_duplicates:
+        parser.error("--duplicate-report と --no-duplicates は同時に指定できません")
+
+    try:
+        core_logic.configure_parser(args.parser)
+    except Exception as e:
+        parser.error(str(e))
+    core_logic.configure_rate_limits(args.rpm, args.tpm, max_concurrency=args.concurrency)
+    core_logic.configure_http(pool_size=args.concurrency)
+    core_logic.configure_repair(not args.no_repair)
+    # The streaming extractor has no main-content mode, so there is nothing per-site to learn from it
+    learn = not args.all_content and not args.streaming
+    core_logic.configure_extraction(not args.all_content, boilerplate.BoilerplateStore(args.boilerplate) if learn else None)
+    cache = None if args.no_cache else GenerationCache(args.cache)
+    fetch_cache = None if args.no_fetch_cache else FetchCache(args.fetch_cache)
+    fingerprints = None if args.no_fingerprints else FingerprintStore(args.fingerprints)
+    duplicates = None if args.no_duplicates else DuplicateIndex(args.duplicates)
+    fetch_content = streaming_extractor.fetch_website_content_streaming if args.streaming else core_logic.fetch_website_content
+    pool = None
+    if args.parse_workers > 0:
+        # Fetch threads only download; parsing runs in worker processes fed through shared memory
+        pool = parse_pool.ParsePool(workers=args.parse_workers)
+        fetch_content = functools.partial(fetch_content, extract=pool.extract)
+    if fetch_cache:
+        fetch_content = functools.partial(fetch_content, fetch_cache=fetch_cache)
+    site_crawler = None
+    if args.crawl:
+        # Discovered URLs are consumed lazily, so generation starts while the crawl is still running
+        site_crawler = crawler.Crawler(
+            args.input,
+            follow_links=args.follow_links,
+            max_depth=args.max_depth,
+            max_urls=args.max_pages,
+            delay=args.crawl_delay,
+            respect_robots=not args.ignore_robots,
+            fetch_cache=fetch_cache
+        )
+        # Pages the crawler downloaded to follow their links are not downloaded again
+        fetch_content = functools.partial(fetch_content, prefetched=site_crawler.take_body)
+        urls = site_crawler.crawl()
+    else:
+        urls = load_urls(args.input)
+    run_id = None
+    if run:
+        # Unfinished pages first, then the original input for anything that was never queued
+        run_id = run['id']
+        urls = itertools.chain(queue.iter_unfinished(run_id), urls)
+        print(f"実行 #{run_id} を再開します", file=sys.stderr)
+    elif queue:
+        run_id = queue.create_run(args.input, args.output, {name: getattr(args, name) for name in RUN_OPTIONS})
+        print(f"実行 #{run_id} (中断した場合は --resume {run_id} で再開できます)", file=sys.stderr)
+    last_metrics_write = time.monotonic()
+
+    def on_progress(record, summary):
+        nonlocal last_metrics_write
+        print_progress(record, summary)
+        if args.metrics and time.monotonic() - last_metrics_write >= METRICS_WRITE_INTERVAL:
+            metrics.registry.write_prometheus(args.metrics)
+            last_metrics_write = time.monotonic()
+
+    try:
+        summary = run_batch(
+            args.api_key,
+            urls,
+            args.output,
+            global_instruction=args.instruction,
+            target_keywords=args.keywords,
+            tone=args.tone,
+            concurrency=args.concurrency,
+            on_progress=on_progress,
+            fetch_content=fetch_content,
+            cache=cache,
+            pages_per_request=max(1, args.pages_per_request),
+            history_store=None if args.no_history else HistoryStore(args.history),
+            fingerprints=fingerprints,
+            only_changed=args.only_changed,
+            queue=queue,
+            run_id=run_id,
+            duplicates=duplicates,
+            discard=site_crawler.take_body if site_crawler else None
+        )
+    finally:
+        if pool:
+            pool.close()
+    if cache:
+        stats = cache.stats()
+        print(f"生成キャッシュ: ヒット {stats['hits']} / ミス {stats['misses']} (ヒット率 {stats['hit_rate']:.1%})", file=sys.stderr)
+    stats = core_logic.gemini_limiter.stats()
+    print(f"API: 呼び出し {stats['calls']} / リトライ {stats['retries']} / 429 {stats['throttled']} (同時実行上限 {stats['concurrency_limit']})", file=sys.stderr)
+    if fetch_cache:
+        stats = fetch_cache.stats()
+        print(f"取得キャッシュ: 304 {stats['not_modified']} / 再取得 {stats['fetched']}", file=sys.stderr)
+    if fingerprints:
+        stats = fingerprints.stats()
+        print(f"ページ内容: 新規 {stats['new']} / 変更 {stats['changed']} / 変更なし {stats['unchanged']}", file=sys.stderr)
+    validation = candidate_validator.summary_text(metrics.registry.counters())
+    if validation:
+        print(validation, file=sys.stderr)
+    extraction = boilerplate.summary_text(metrics.registry.counters())
+    if extraction:
+        print(extraction, file=sys.stderr)
+    if args.metrics:
+        metrics.registry.write_prometheus(args.metrics)
+    if args.timings:
+        print_stage_timings()
+    if summary['near_duplicates']:
+        print(f"他のページと類似した説明文: {summary['near_duplicates']}ページ", file=sys.stderr)
+    if args.duplicate_report:
+        write_duplicate_report(duplicates, args.duplicate_report)
+    if summary['already_generated']:
+        print(f"前回までに完了済み: {summary['already_generated']}件", file=sys.stderr)
+    print(f"完了: {summary['total']}件 (成功 {summary['succeeded']} / 失敗 {summary['failed']} / スキップ {summary['skipped']})", file=sys.stderr)
+    return 0 if summary["failed"] == 0 else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# Prompt size with main-content extraction (boilerplate) vs the plain h1/h2/p extraction: characters sent
+# to the model on benchmarks/corpus, and pages/sec of both per parser backend (main content walks the whole
+# tree, so it costs more). Then a generated site whose pages share a header text, sidebar and footer without
+# any tell-tale markup, so only the learned per-site store can drop them.
+# Usage: python benchmarks/bench_boilerplate.py [pages]
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import boilerplate
+import core_logic
+import metrics
+import parser_backends
+from bench_parser_backends import CONTENT_TYPES, load_corpus
+
+SITE_TEMPLATE = """<html><head><title>{title} | 山田工務店</title><meta name="description" content="{title}のご案内"></head><body>
+<div class="top"><p>創業50年、地域密着の山田工務店です。新築・リフォーム・外構工事まで、住まいのことなら何でもご相談ください。</p></div>
+<div class="wrap"><div class="col-l"><h1>{title}</h1>{body}</div>
+<div class="col-r"><p>お見積り・現地調査は無料です。お電話またはメールフォームからお気軽にお問い合わせください。</p>
+<p>営業時間 9:00〜18:00（日曜・祝日定休）。緊急の水漏れ・雨漏りは24時間受け付けています。</p>
+<ul><li><a href="/works/">施工事例</a></li><li><a href="/voice/">お客様の声</a></li><li><a href="/company/">会社概要</a></li></ul></div></div>
+<div class="btm"><p>山田工務店　〒000-0000 東京都架空区見本町1-2-3　TEL 00-0000-0000　建設業許可 東京都知事許可 第00000号</p></div>
+</body></html>"""
+
+TOPICS = ('キッチン', '浴室', 'トイレ', '外壁塗装', '屋根', '断熱', '耐震補強', '間取り変更')
+
+def site_page(number):
+    topic = TOPICS[number % len(TOPICS)]
+    body = "".join(
+        f"<p>{topic}の施工事例{number}-{i}。築{20 + number % 15}年の住宅で{topic}の工事を行い、工期は{3 + i}日でした。"
+        f"お客様のご要望に合わせて素材と設備を選び、費用は約{50 + number + i * 10}万円に収まりました。</p>"
+        for i in range(4)
+    )
+    return f"https://example.test/works/{number}/", SITE_TEMPLATE.format(title=f"{topic}リフォーム事例 No.{number}", body=body)
+
+def rate(fn, items, rounds=5):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in items:
+            fn(item)
+    return len(items) * rounds / (time.perf_counter() - start)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    documents = [(name, core_logic.decode_html(content, CONTENT_TYPES.get(name))) for name, content in load_corpus()]
+    plain = parser_backends.get_backend()
+    print(f"{'page':<28} {'plain chars':>12} {'main chars':>11} {'saved':>7}")
+    totals = [0, 0]
+    for name, html in documents:
+        before = len(plain(html, core_logic.MAX_CONTENT_CHARS))
+        after = len(boilerplate.extract_main_content(html, core_logic.MAX_CONTENT_CHARS))
+        totals[0] += before
+        totals[1] += after
+        print(f"{name:<28} {before:>12,} {after:>11,} {1 - after / before:>7.0%}")
+    print(f"{'total':<28} {totals[0]:>12,} {totals[1]:>11,} {1 - totals[1] / totals[0]:>7.0%}")
+    for backend in parser_backends.available_backends():
+        extract = parser_backends.BACKENDS[backend]
+        plain_rate = rate(lambda doc: extract(doc[1], core_logic.MAX_CONTENT_CHARS), documents)
+        main_rate = rate(lambda doc: boilerplate.extract_main_content(doc[1], core_logic.MAX_CONTENT_CHARS, backend), documents)
+        print(f"{backend:<12} plain {plain_rate:8.1f} pages/s  main content {main_rate:8.1f} pages/s ({main_rate / plain_rate:.2f}x)")
+
+    pages = [site_page(number) for number in range(count)]
+    with tempfile.TemporaryDirectory() as directory:
+        store = boilerplate.BoilerplateStore(os.path.join(directory, 'boilerplate.sqlite3'))
+        scored = [(url, boilerplate.extract_main_content(html, core_logic.MAX_CONTENT_CHARS)) for url, html in pages]
+        start = time.perf_counter()
+        learned = [len(boilerplate.strip_repeated(text, url, store)) for url, text in scored]
+        elapsed = time.perf_counter() - start
+        store.close()
+    before = statistics.mean(len(plain(html, core_logic.MAX_CONTENT_CHARS)) for _, html in pages)
+    print(f"generated site ({count} pages sharing header/sidebar/footer text):")
+    print(f"  plain {before:.0f} chars/page  scored only {statistics.mean(len(text) for _, text in scored):.0f}"
+          f"  with the learned store {statistics.mean(learned[boilerplate.MIN_PAGES:]):.0f} (after the first {boilerplate.MIN_PAGES} pages)")
+    print(f"  learning: {count / elapsed:.1f} pages/s")
+    print(boilerplate.summary_text(metrics.registry.counters()))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
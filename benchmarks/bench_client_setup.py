@@ -0,0 +1,45 @@
+# Measures the per-call setup overhead of the Gemini SDK (no network, no real API key needed).
+# "per call" reproduces the old pattern: configure() + GenerativeModel() + a fresh transport on every request.
+# "shared client" is core_logic.get_client(), created once per API key.
+# Usage: python benchmarks/bench_client_setup.py [iterations]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import google.generativeai as genai
+from google.generativeai import client as genai_client
+
+import core_logic
+
+API_KEY = "benchmark-dummy-key"
+
+def setup_per_call():
+    genai.configure(api_key=API_KEY)
+    model = genai.GenerativeModel(core_logic.GEMINI_MODEL_NAME)
+    # generate_content() builds this lazily on its first request; configure() throws the old one away
+    model._client = genai_client.get_default_generative_client()
+    return model
+
+def setup_shared():
+    return core_logic.get_client(API_KEY).model
+
+def measure(fn, iterations):
+    fn() # warm-up (imports, first client)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    per_call = measure(setup_per_call, iterations)
+    shared = measure(setup_shared, iterations)
+    print(f"iterations:      {iterations}")
+    print(f"per-call setup:  {per_call * 1e6:10.1f} us/call")
+    print(f"shared client:   {shared * 1e6:10.1f} us/call")
+    print(f"saved per 10k:   {(per_call - shared) * 10000:10.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Connections opened by the real fetch path (core_logic.fetch_website_content on the shared keep-alive session)
+# against a fresh requests.get per page, which is how pages used to be downloaded. A local HTTP/1.1 server counts
+# accepted connections; --connect-ms delays every new connection to stand in for the TCP/TLS handshake.
+# Usage: python benchmarks/bench_connection_reuse.py [--pages N] [--concurrency N] [--connect-ms MS]
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import requests
+
+import core_logic
+
+PAGE = ('<html><head><meta charset="utf-8"><title>接続の再利用</title></head><body><h1>見出し</h1>'
+        + '<p>本文の段落です。同じホストのページを続けて取得します。</p>' * 50 + '</body></html>').encode('utf-8')
+
+def start_server(connect_delay):
+    connections = [0]
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True # Headers and body go out in separate writes; don't stall reused connections
+
+        def setup(self):
+            super().setup()
+            with lock:
+                connections[0] += 1
+            time.sleep(connect_delay)
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+
+        def log_message(self, *args):
+            pass
+
+    class QuietServer(ThreadingHTTPServer):
+        daemon_threads = True
+
+        def handle_error(self, request, client_address):
+            pass
+
+    server = QuietServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, connections
+
+def fresh_get(url):
+    response = requests.get(url, headers=core_logic.REQUEST_HEADERS, timeout=10)
+    response.raise_for_status()
+    return core_logic.extract_website_text(core_logic.decode_html(response.content, response.headers.get('Content-Type')))
+
+def run(fetch, base, pages, concurrency, connections):
+    before = connections[0]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        texts = list(executor.map(fetch, (f"{base}/page/{i}" for i in range(pages))))
+    elapsed = time.perf_counter() - start
+    return connections[0] - before, pages / elapsed, texts
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--connect-ms", type=float, default=20)
+    args = parser.parse_args(argv)
+
+    server, connections = start_server(args.connect_ms / 1000)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    core_logic.configure_http(pool_size=args.concurrency)
+    core_logic.extract_website_text(PAGE.decode('utf-8')) # Parser imports stay out of the first timing
+    try:
+        fresh = run(fresh_get, base, args.pages, args.concurrency, connections)
+        shared = run(core_logic.fetch_website_content, base, args.pages, args.concurrency, connections)
+    finally:
+        server.shutdown()
+    print(f"{args.pages} pages, {args.concurrency} threads, {args.connect_ms:g}ms per new connection")
+    print(f"{'':<28} {'connections':>11} {'pages/s':>9}")
+    print(f"{'requests.get per page':<28} {fresh[0]:>11} {fresh[1]:>9.1f}")
+    print(f"{'shared session (fetch path)':<28} {shared[0]:>11} {shared[1]:>9.1f}")
+    print(f"same text: {'yes' if fresh[2] == shared[2] else 'NO'}")
+    return 0 if shared[0] <= args.concurrency and fresh[2] == shared[2] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
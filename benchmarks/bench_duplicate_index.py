@@ -0,0 +1,54 @@
+# Scaling of the near-duplicate description index (duplicate_index): indexing rate, per-page query latency
+# as the index grows, and the site-wide report, on synthetic descriptions where every tenth page comes
+# from a shared template. Query time should stay in milliseconds as the index grows (only the rows of the
+# matching LSH buckets are read, never a scan of every description).
+# Usage: python benchmarks/bench_duplicate_index.py [pages]
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import duplicate_index
+
+TEMPLATES = (
+    "【{}】の商品一覧。人気の{}を豊富に取り揃えています。送料無料・最短翌日お届け。会員登録でポイント還元、期間限定セールも開催中です。",
+    "{}のことなら当店へ。{}の選び方から使い方まで専門スタッフが丁寧にご案内します。店舗受け取りにも対応、まずはお気軽にご相談ください。",
+)
+WORDS = "東京 大阪 名古屋 福岡 札幌 商品 価格 送料 無料 配送 人気 新作 限定 セール 特集 比較 口コミ 評判 おすすめ 最新".split()
+
+def description(rng, page):
+    if page % 10 == 0:
+        return rng.choice(TEMPLATES).format(f"カテゴリ{page}", f"商品{page}")
+    return "".join(rng.choice(WORDS) for _ in range(40))
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(0)
+    directory = tempfile.mkdtemp(prefix="bench_duplicate_index_")
+    path = os.path.join(directory, "duplicates.sqlite3")
+    index = duplicate_index.DuplicateIndex(path)
+    checkpoints = {pages // 10, pages // 2, pages}
+    start = time.perf_counter()
+    for page in range(1, pages + 1):
+        index.update(f"https://example.com/{page}", [description(rng, page)])
+        if page in checkpoints:
+            elapsed = time.perf_counter() - start
+            probe = time.perf_counter()
+            for n in range(50):
+                index.query(description(rng, n * 7), exclude_url="probe")
+            query_ms = (time.perf_counter() - probe) / 50 * 1000
+            print(f"{page:>8} pages  index {page / elapsed:7.0f} pages/s  query {query_ms:6.2f} ms")
+    started = time.perf_counter()
+    clusters = duplicate_index.DuplicateIndex(path).report()
+    print(f"report: {len(clusters)} groups, {sum(cluster['pages'] for cluster in clusters)} pages in {time.perf_counter() - started:.2f}s")
+    index.close()
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# Compares the HTML parser backends (parser_backends) on the saved pages in benchmarks/corpus
+# (Japanese and English; UTF-8, Shift_JIS and undeclared EUC-JP). Reports pages/sec per backend
+# and checks that every backend extracts exactly the same text as the html.parser reference.
+# Also times encoding detection: full-body detection (the old apparent_encoding) vs header/meta/prefix.
+# Usage: python benchmarks/bench_parser_backends.py [rounds]
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from requests.compat import chardet
+
+import core_logic
+import parser_backends
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+# Pages saved without a charset declaration that a server would have sent in the header
+CONTENT_TYPES = {
+    'en_landing.html': 'text/html; charset=utf-8',
+}
+
+def load_corpus():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(CORPUS_DIR, '*.html'))):
+        with open(path, 'rb') as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+def measure(fn, items, rounds):
+    fn(items[0]) # warm-up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for item in items:
+            fn(item)
+    return len(items) * rounds / (time.perf_counter() - start)
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    pages = load_corpus()
+    print(f"corpus: {len(pages)} pages, {sum(len(content) for _, content in pages) // 1024} KB  rounds: {rounds}")
+
+    def decode_full(page):
+        name, content = page
+        return str(content, chardet.detect(content)['encoding'] or 'utf-8', errors='replace')
+
+    def decode_sniff(page):
+        name, content = page
+        return core_logic.decode_html(content, CONTENT_TYPES.get(name))
+
+    print(f"{'encoding: full-body detection':<34} {measure(decode_full, pages, rounds):9.1f} pages/s")
+    print(f"{'encoding: header/meta/prefix':<34} {measure(decode_sniff, pages, rounds):9.1f} pages/s")
+
+    documents = [(name, decode_sniff((name, content))) for name, content in pages]
+    reference = {name: parser_backends.extract_html_parser(html, core_logic.MAX_CONTENT_CHARS) for name, html in documents}
+    for name, html in documents:
+        if 'Title: ' not in reference[name] or '�' in reference[name]:
+            print(f"warning: {name} did not decode cleanly")
+
+    all_identical = True
+    for backend in parser_backends.available_backends():
+        extract = parser_backends.BACKENDS[backend]
+        mismatches = [name for name, html in documents if extract(html, core_logic.MAX_CONTENT_CHARS) != reference[name]]
+        rate = measure(lambda doc: extract(doc[1], core_logic.MAX_CONTENT_CHARS), documents, rounds)
+        status = "identical" if not mismatches else "DIFFERS: " + ", ".join(mismatches)
+        all_identical = all_identical and not mismatches
+        print(f"{'parser: ' + backend:<34} {rate:9.1f} pages/s  {status}")
+    return 0 if all_identical else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
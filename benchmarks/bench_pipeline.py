@@ -0,0 +1,282 @@
+# End-to-end fetch -> generate benchmark that needs no network and no API key.
+# A local HTTP server serves a synthetic corpus (configurable page size and response latency) and a stub
+# Gemini model (configurable latency, error rate and 429 rate) stands in for the API. The real batch
+# pipeline (batch_runner.run_batch, rate limiter, retries, parsing) runs in between.
+# Reports pages/sec, p50/p95/p99 page latency, CPU time and peak RSS.
+# Save a run with --json and compare later runs against it with --baseline to catch regressions.
+# Usage: python benchmarks/bench_pipeline.py [--pages 200] [--page-kb 100] [--server-latency-ms 50] ...
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError: # Peak RSS on Windows needs psutil
+    psutil = None
+
+import batch_runner
+import core_logic
+import parse_pool
+
+API_KEY = "benchmark-stub-key"
+
+def build_page(page_id, size_bytes):
+    paragraph = (
+        f'<p>ページ{page_id}の本文です。この段落は検索結果に表示される説明文の材料になる、十分な長さを持ったテキストです。</p>'
+        '<div class="card"><a href="/related">関連商品</a><span class="price">¥1,980</span></div>'
+    )
+    head = (
+        f'<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8"><title>ベンチマーク用ページ {page_id}</title>'
+        f'<meta name="description" content="ページ{page_id}の現在の説明文です。"></head><body>'
+        f'<h1>ベンチマーク用ページ {page_id} へようこそ、これは見出しです</h1>'
+    )
+    repeat = max(1, (size_bytes - len(head.encode('utf-8'))) // len(paragraph.encode('utf-8')))
+    return (head + paragraph * repeat + '</body></html>').encode('utf-8')
+
+def start_server(page_bytes, latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            match = re.fullmatch(r'/page/(\d+)', self.path)
+            if not match:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if latency:
+                time.sleep(latency)
+            body = build_page(match.group(1), page_bytes)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    class QuietServer(ThreadingHTTPServer):
+        daemon_threads = True
+
+        def handle_error(self, request, client_address):
+            pass
+
+    server = QuietServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+class StubApiError(Exception):
+    # Carries an HTTP status in .code, like the google.api_core exceptions
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+class StubGeminiModel:
+    # Drop-in for genai.GenerativeModel.generate_content: answers in the JSON shape the prompts ask for
+    def __init__(self, latency, error_rate=0.0, throttle_rate=0.0, jitter=0.2, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.throttled = 0
+
+    # Distinct, full-length descriptions, so candidates pass candidate_validator and no repair request is made
+    DESCRIPTIONS = (
+        "ベンチマーク用ページ{}の特長をわかりやすくまとめました。初めての方でも迷わず選べるよう、料金・機能・サポート体制を比較しながら、導入までの流れを具体的な事例とともに丁寧にご紹介しています。",
+        "ページ{}をお探しですか？よくある疑問や失敗しない選び方、実際に利用したお客様の声まで、知りたい情報をこの一ページに集約。今すぐ確認して、あなたに合ったプランを無料で見つけてください。",
+        "【ページ{}】人気の理由は、充実した品揃えと最短翌日のお届け。会員登録で毎月のクーポンやポイント還元も受けられます。期間限定のキャンペーン情報や新商品も随時更新中なので、ぜひご覧ください。",
+    )
+
+    def _suggestions(self, page_id):
+        return [
+            {"title": f"パターン{n}", "title_tag": f"ページ{page_id}のタイトル{n}", "description": description.format(page_id)}
+            for n, description in enumerate(self.DESCRIPTIONS, 1)
+        ]
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+            delay = self.latency * self._random.uniform(1 - self.jitter, 1 + self.jitter)
+        time.sleep(delay)
+        if roll < self.throttle_rate:
+            with self._lock:
+                self.throttled += 1
+            raise StubApiError(429, "429 Resource has been exhausted (stub)")
+        if roll < self.throttle_rate + self.error_rate:
+            with self._lock:
+                self.errors += 1
+            raise StubApiError(500, "500 Internal error (stub)")
+        page_ids = re.findall(r'=== ページID: (\S+) ===', prompt)
+        if page_ids:
+            text = json.dumps({page_id: self._suggestions(page_id) for page_id in page_ids}, ensure_ascii=False)
+        else:
+            text = json.dumps(self._suggestions("single"), ensure_ascii=False)
+        if stream:
+            return [StubResponse(text[i:i + 64]) for i in range(0, len(text), 64)]
+        return StubResponse(text)
+
+def percentile(values, pct):
+    # Nearest-rank percentile
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered))))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def cpu_seconds():
+    times = os.times()
+    # children_* counts parse workers once the pool has been shut down
+    return times.user + times.system + times.children_user + times.children_system
+
+def peak_rss_mb():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024 # bytes on macOS, KB on Linux
+    if psutil is not None:
+        return psutil.Process().memory_info().peak_wset / 1024 / 1024
+    return None
+
+def run(args):
+    server = start_server(args.page_kb * 1024, args.server_latency_ms / 1000.0)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = [f"{base_url}/page/{i}" for i in range(args.pages)]
+
+    model = StubGeminiModel(args.api_latency_ms / 1000.0, args.error_rate, args.throttle_rate, seed=args.seed)
+    core_logic._clients[API_KEY] = core_logic.GeminiClient(API_KEY, model=model)
+    core_logic.configure_rate_limits(args.rpm, args.tpm, max_concurrency=args.concurrency)
+    # Keep retries realistic in count but short in wall time
+    core_logic.gemini_limiter.base_delay = args.backoff_ms / 1000.0
+    core_logic.gemini_limiter.max_delay = max(core_logic.gemini_limiter.base_delay, 1.0)
+    core_logic.configure_parser(args.parser)
+
+    pool = parse_pool.ParsePool(workers=args.parse_workers) if args.parse_workers else None
+    started = {}
+    latencies = []
+    lock = threading.Lock()
+
+    def fetch_content(url):
+        with lock:
+            started.setdefault(url, time.perf_counter())
+        if pool:
+            return core_logic.fetch_website_content(url, extract=pool.extract)
+        return core_logic.fetch_website_content(url)
+
+    def on_progress(record, summary):
+        with lock:
+            latencies.append(time.perf_counter() - started.get(record['url'], time.perf_counter()))
+
+    output_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    output_path = os.path.join(output_dir, "results.jsonl")
+    cpu_start = cpu_seconds()
+    wall_start = time.perf_counter()
+    try:
+        summary = batch_runner.run_batch(
+            API_KEY, urls, output_path,
+            concurrency=args.concurrency,
+            on_progress=on_progress,
+            fetch_content=fetch_content,
+            pages_per_request=args.pages_per_request
+        )
+    finally:
+        if pool:
+            pool.close()
+        server.shutdown()
+    wall = time.perf_counter() - wall_start
+    cpu = cpu_seconds() - cpu_start
+    os.remove(output_path)
+    os.rmdir(output_dir)
+
+    limiter = core_logic.gemini_limiter.stats()
+    peak_rss = peak_rss_mb()
+    return {
+        "pages": args.pages,
+        "succeeded": summary['succeeded'],
+        "failed": summary['failed'],
+        "wall_seconds": round(wall, 3),
+        "pages_per_sec": round(args.pages / wall, 2),
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "latency_p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "latency_p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "cpu_seconds": round(cpu, 3),
+        "cpu_percent": round(cpu / wall * 100, 1),
+        "peak_rss_mb": round(peak_rss, 1) if peak_rss is not None else None,
+        "api_calls": model.calls,
+        "api_retries": limiter['retries'],
+        "api_429": model.throttled,
+        "api_errors": model.errors,
+    }
+
+def compare(result, baseline, tolerance):
+    # Returns the list of regressions beyond the tolerance (fraction)
+    regressions = []
+    if result['pages_per_sec'] < baseline['pages_per_sec'] * (1 - tolerance):
+        regressions.append(f"pages/sec {baseline['pages_per_sec']} -> {result['pages_per_sec']}")
+    for key in ('latency_p95_ms', 'latency_p99_ms', 'cpu_seconds'):
+        if baseline.get(key) and result[key] > baseline[key] * (1 + tolerance):
+            regressions.append(f"{key} {baseline[key]} -> {result[key]}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ネットワークとAPIキーなしで取得→生成パイプラインの性能を計測します")
+    parser.add_argument("--pages", type=int, default=200, help="処理するページ数")
+    parser.add_argument("--page-kb", type=int, default=100, help="1ページのHTMLサイズ (KB)")
+    parser.add_argument("--server-latency-ms", type=float, default=50, help="モックサーバーの応答遅延 (ミリ秒)")
+    parser.add_argument("--api-latency-ms", type=float, default=300, help="スタブAPIの応答遅延 (ミリ秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="スタブAPIが500エラーを返す割合 (0〜1)")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="スタブAPIが429を返す割合 (0〜1)")
+    parser.add_argument("--backoff-ms", type=float, default=50, help="リトライ待機の基準時間 (ミリ秒)")
+    parser.add_argument("--concurrency", type=int, default=8, help="同時処理数")
+    parser.add_argument("--pages-per-request", type=int, default=1, help="1回のAPIリクエストにまとめるページ数")
+    parser.add_argument("--rpm", type=int, default=1000000, help="1分あたりリクエスト上限")
+    parser.add_argument("--tpm", type=int, default=1000000000, help="1分あたりトークン上限")
+    parser.add_argument("--parser", help="HTMLパーサー (既定: 利用可能な最速のもの)")
+    parser.add_argument("--parse-workers", type=int, default=0, help="HTML解析プロセス数 (0: 取得スレッド内で解析)")
+    parser.add_argument("--seed", type=int, default=0, help="スタブAPIの乱数シード")
+    parser.add_argument("--json", help="結果をJSONで保存するパス")
+    parser.add_argument("--baseline", help="比較対象の結果JSON (性能が劣化していれば終了コード1)")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="劣化とみなす変化率 (既定: 0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    for key, value in result.items():
+        print(f"{key:<16} {value}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION: {line}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
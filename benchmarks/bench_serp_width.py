@@ -0,0 +1,33 @@
+# Throughput of the SERP width measurement (serp_width) over synthetic Japanese, English and mixed rows,
+# the same check (word-wrapped onto the two snippet lines) the result cards run on every keystroke and
+# batch audits run over every description.
+# Usage: python benchmarks/bench_serp_width.py [rows]
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import serp_width
+
+SAMPLES = {
+    'ja': "東京の歯医者なら〇〇デンタルクリニック。土日も診療、駅から徒歩3分。痛みに配慮した治療と丁寧な説明で、初めての方も安心してご来院いただけます。",
+    'en': "Book a dentist in Tokyo open on weekends, 3 minutes from the station. Gentle treatment and clear explanations for first-time patients.",
+    'mixed': "【公式】ABCデンタル｜Tokyo Dental Clinic - 土日診療・ｵﾝﾗｲﾝ予約OK。Visa/Master対応、English available 😀",
+}
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    for name, text in SAMPLES.items():
+        batch = [text[:len(text) - i % 10] for i in range(rows)]
+        start = time.perf_counter()
+        for row in batch:
+            serp_width.description_fits(row)
+        elapsed = time.perf_counter() - start
+        chars = sum(map(len, batch))
+        print(f"{name:<6} {rows / elapsed:10.0f} rows/s  {chars / elapsed / 1e6:6.2f} M chars/s  "
+              f"({serp_width.description_width(text):.0f}px on {serp_width.description_lines(text)} lines, cut at {serp_width.truncation_index(text, serp_width.TITLE_MAX_PX, serp_width.TITLE_FONT_PX)} chars as a title)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# Startup cost of the GUI: import time of main.py per module (python -X importtime in fresh interpreters),
+# the background warm-up that follows the first frame, and optionally the real time-to-first-frame of
+# the Flet window (needs a display).
+# Fails (exit code 1) if a module that should load lazily is imported at startup again.
+# Usage: python benchmarks/bench_startup.py [--runs 5] [--top 15] [--first-frame]
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Imported on first use or by core_logic.warm_up(), never while the window is being built
+LAZY_MODULES = ('google.generativeai', 'requests', 'bs4', 'lxml.html', 'selectolax.lexbor', 'pyarrow')
+
+_IMPORTTIME_RE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|\s+(\S+)')
+
+def import_times(statement):
+    # {module: (self µs, cumulative µs)} for one fresh interpreter
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            modules[match.group(3)] = (int(match.group(1)), int(match.group(2)))
+    return modules
+
+def wall_time(statement):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', statement], cwd=ROOT, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+def first_frame(timeout):
+    # Seconds from launching main.py to its first page.add(), or None without a display
+    env = dict(os.environ, METADESC_STARTUP_BENCHMARK="1")
+    launched = time.time()
+    try:
+        result = subprocess.run(
+            [sys.executable, 'main.py'], cwd=ROOT, env=env, capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return None
+    match = re.search(r'FIRST_FRAME (\d+\.\d+)', result.stdout)
+    return float(match.group(1)) - launched if match else None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="GUIの起動時間（モジュール別インポート時間・初回描画まで）を計測します")
+    parser.add_argument("--runs", type=int, default=5, help="計測回数 (中央値を表示)")
+    parser.add_argument("--top", type=int, default=15, help="表示するモジュール数")
+    parser.add_argument("--first-frame", action="store_true", help="実際にウィンドウを起動して初回描画までの時間を計測 (画面が必要)")
+    parser.add_argument("--timeout", type=float, default=60, help="初回描画を待つ秒数")
+    args = parser.parse_args(argv)
+
+    runs = [import_times("import main") for _ in range(args.runs)]
+    cumulative = {name: statistics.median(run[name][1] for run in runs if name in run) for name in runs[0]}
+    own = {name: statistics.median(run[name][0] for run in runs if name in run) for name in runs[0]}
+    print(f"import main: {cumulative['main'] / 1000:.1f} ms (中央値, {args.runs}回)")
+    print(f"{'module':<40} {'self ms':>9} {'cumul ms':>9}")
+    for name in sorted(own, key=own.get, reverse=True)[:args.top]:
+        print(f"{name:<40} {own[name] / 1000:9.1f} {cumulative[name] / 1000:9.1f}")
+    print("this repository's modules (cumulative):")
+    for name in sorted(cumulative, key=cumulative.get, reverse=True):
+        if os.path.exists(os.path.join(ROOT, name + '.py')):
+            print(f"  {name:<38} {cumulative[name] / 1000:9.1f} ms")
+
+    warm = statistics.median(
+        wall_time("import core_logic; core_logic.warm_up()") - wall_time("import core_logic") for _ in range(args.runs)
+    )
+    print(f"warm-up (background thread after the first frame): {warm * 1000:.0f} ms")
+
+    if args.first_frame:
+        frames = [first_frame(args.timeout) for _ in range(args.runs)]
+        frames = [value for value in frames if value is not None]
+        if frames:
+            print(f"time-to-first-frame: {statistics.median(frames) * 1000:.0f} ms (中央値, {len(frames)}回)")
+        else:
+            print("time-to-first-frame: 計測できませんでした (画面がない環境では利用できません)")
+
+    eager = [name for name in LAZY_MODULES if any(name in run for run in runs)]
+    for name in eager:
+        print(f"REGRESSION: {name} is imported at startup")
+    return 1 if eager else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
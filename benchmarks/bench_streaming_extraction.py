@@ -0,0 +1,103 @@
+# Compares the full-download BeautifulSoup path with the streaming extractor.
+# Usage: python benchmarks/bench_streaming_extraction.py [URL ...]
+# Without URLs a local server serves synthetic heavy pages (multi-MB e-commerce style HTML).
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import requests
+
+import core_logic
+import streaming_extractor
+
+def build_heavy_page(product_count):
+    items = []
+    for i in range(product_count):
+        items.append(
+            f'<div class="product"><a href="/item/{i}"><img src="/img/{i}.jpg" alt="商品{i}"></a>'
+            f'<h2>人気商品 No.{i} 送料無料でお届けする高品質アイテム</h2>'
+            f'<p>この商品は毎日の暮らしを快適にするために設計されました。素材にこだわり、長くお使いいただけます。型番 {i}</p>'
+            f'<span class="price">¥{1000 + i}</span></div>'
+        )
+    return (
+        '<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8">'
+        '<title>大型ECサイト | 全商品一覧</title>'
+        '<meta name="description" content="人気商品を多数取り揃えた通販サイトです。">'
+        '<script>' + 'var tracking = {};' * 2000 + '</script></head><body>'
+        '<h1>全商品一覧ページへようこそ、お気に入りを見つけてください</h1>'
+        + "".join(items) + '</body></html>'
+    ).encode('utf-8')
+
+def start_server(pages):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            body = pages.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass # The streaming client hung up early, which is the point
+
+        def log_message(self, *args):
+            pass
+
+    class QuietServer(ThreadingHTTPServer):
+        def handle_error(self, request, client_address):
+            pass # Early-closed connections are expected
+
+    server = QuietServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def run_full(url):
+    start = time.perf_counter()
+    response = requests.get(url, headers=core_logic.REQUEST_HEADERS, timeout=30)
+    response.raise_for_status()
+    downloaded = time.perf_counter()
+    response.encoding = response.apparent_encoding
+    text = core_logic.extract_website_text(response.text, main_content=False) # The streaming path has no main-content mode
+    end = time.perf_counter()
+    return text, len(response.content), downloaded - start, end - downloaded, end - start
+
+def run_streaming(url):
+    start = time.perf_counter()
+    text, bytes_read = streaming_extractor.fetch_streaming_with_stats(url)
+    end = time.perf_counter()
+    return text, bytes_read, None, None, end - start
+
+def main():
+    urls = sys.argv[1:]
+    server = None
+    if not urls:
+        pages = {f"/heavy{n}": build_heavy_page(n) for n in (1000, 3000, 10000)}
+        server = start_server(pages)
+        urls = [f"http://127.0.0.1:{server.server_port}{path}" for path in pages]
+
+    print(f"{'URL':<40} {'path':<10} {'bytes read':>12} {'download s':>11} {'parse s':>9} {'total s':>9}  same")
+    for url in urls:
+        full = run_full(url)
+        stream = run_streaming(url)
+        same = "yes" if full[0] == stream[0] else "NO"
+        label = url[-40:]
+        print(f"{label:<40} {'full':<10} {full[1]:>12,} {full[2]:>11.3f} {full[3]:>9.3f} {full[4]:>9.3f}")
+        print(f"{'':<40} {'streaming':<10} {stream[1]:>12,} {'-':>11} {'-':>9} {stream[4]:>9.3f}  {same}")
+
+    if server:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+import hashlib
+import re
+import threading
+import time
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+import metrics
+import parser_backends
+import sqlite_util
+from page_fingerprints import normalize_text
+
+# Main-content extraction: the page is split into text blocks, and navigation, footers, link lists and
+# blocks repeated across many pages of the same site are dropped before the text goes into the prompt.
+BLOCK_TAGS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'dd', 'div', 'dl', 'dt', 'figcaption', 'figure', 'footer',
+    'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section',
+    'table', 'td', 'th', 'tr', 'ul',
+))
+VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'))
+# Closed implicitly by the next sibling of the same kind (<li>a<li>b)
+SELF_CLOSING_SIBLINGS = frozenset(('p', 'li', 'dt', 'dd', 'tr', 'td', 'th'))
+SKIP_TEXT_TAGS = parser_backends.SKIP_TEXT_TAGS + ('noscript', 'pre') # Code listings don't help a description
+
+BOILERPLATE_TAGS = frozenset(('nav', 'footer', 'aside', 'form'))
+CONTENT_TAGS = frozenset(('article', 'main'))
+_BOILERPLATE_HINT_RE = re.compile(
+    r'nav|menu|footer|sidebar|side-bar|breadcrumb|cookie|consent|banner|share|sns|social|pagination|pager|'
+    r'related|recommend|ranking|copyright|widget|(?:^|[-_ ])ads?(?:$|[-_ ])|advert',
+    re.IGNORECASE
+)
+
+MAX_LINK_DENSITY = 0.5 # Share of a block's text inside <a>
+MIN_TEXT_DENSITY = 8   # Characters per tag inside the block; lower is a tag cloud or breadcrumb
+
+# Learned boilerplate: a block is dropped once it has appeared on this many pages of the domain
+# and on at least this share of the domain's pages seen so far
+MIN_PAGES = 3
+MIN_PAGE_RATIO = 0.5
+
+# Bumped whenever the extraction output changes, so cached extractions (fetch_cache) are redone
+VERSION = 3
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_HEADER_PREFIXES = ("Title: ", "Current Description: ")
+
+class _BlockBuilder:
+    # Turns start/end/text events into text blocks; fed by a tree walk (selectolax, lxml) or by HTMLParser
+    def __init__(self):
+        self.blocks = [] # {text, links, tags, boilerplate}
+        self.stack = [] # [(tag, 'boilerplate' | 'content' | None)]
+        self._link_depth = 0
+        self._pieces = []
+        self._link_chars = 0
+        self._tags = 0
+
+    def _flag(self, tag, hints):
+        if tag in CONTENT_TAGS:
+            return 'content'
+        if tag in BOILERPLATE_TAGS:
+            return 'boilerplate'
+        if tag == 'header' and not any(flag == 'content' for _, flag in self.stack):
+            return 'boilerplate' # Site header; an <article>'s own header is content
+        if hints and _BOILERPLATE_HINT_RE.search(hints):
+            return 'boilerplate'
+        return None
+
+    def _structural(self):
+        # The innermost flagged ancestor decides (a <nav> inside an <article> is still navigation)
+        for _, flag in reversed(self.stack):
+            if flag:
+                return flag == 'boilerplate'
+        return False
+
+    def flush(self):
+        # Whitespace runs collapse to one space, so each block is one line of the extracted text
+        text = _WHITESPACE_RE.sub(' ', "".join(self._pieces)).strip() if self._pieces else ""
+        if text:
+            self.blocks.append({
+                "text": text,
+                "links": self._link_chars,
+                "tags": self._tags,
+                "boilerplate": self._structural(),
+            })
+        self._pieces = []
+        self._link_chars = 0
+        self._tags = 0
+
+    def start(self, tag, hints=""):
+        if tag in VOID_TAGS:
+            self._tags += 1
+            return
+        if tag in BLOCK_TAGS:
+            self.flush()
+        else:
+            self._tags += 1
+        if tag == 'a':
+            self._link_depth += 1
+        self.stack.append((tag, self._flag(tag, hints)))
+
+    def end(self, tag):
+        if tag in VOID_TAGS:
+            return
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i][0] == tag:
+                if tag == 'a' and self._link_depth:
+                    self._link_depth -= 1
+                if tag in BLOCK_TAGS or any(open_tag in BLOCK_TAGS for open_tag, _ in self.stack[i + 1:]):
+                    self.flush()
+                del self.stack[i:]
+                break
+
+    def text(self, data):
+        if data:
+            self._pieces.append(data)
+            if self._link_depth:
+                self._link_chars += len(data.strip())
+
+def _hints(get):
+    return " ".join(value for value in (get('class'), get('id'), get('role')) if value)
+
+class _BlockParser(HTMLParser):
+    # Fallback without a tree builder: the event stream is tag soup, so implicitly closed siblings are handled here
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = None
+        self.meta_desc = ""
+        self.builder = _BlockBuilder()
+        self._meta_seen = False
+        self._in_title = False
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'title' and self.title is None:
+            self._in_title = True
+            self.title = ""
+            return
+        if tag == 'meta':
+            if not self._meta_seen:
+                attrs = dict(attrs)
+                if attrs.get('name') == 'description':
+                    self._meta_seen = True
+                    self.meta_desc = attrs.get('content') or ''
+            return
+        if tag in SKIP_TEXT_TAGS:
+            self._skip_depth += 1
+            return
+        stack = self.builder.stack
+        if tag in SELF_CLOSING_SIBLINGS and stack and stack[-1][0] == tag:
+            self.builder.end(tag)
+        self.builder.start(tag, _hints(dict(attrs).get))
+
+    def handle_startendtag(self, tag, attrs):
+        if tag == 'meta':
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == 'title':
+            self._in_title = False
+            return
+        if tag in SKIP_TEXT_TAGS:
+            if self._skip_depth:
+                self._skip_depth -= 1
+            return
+        self.builder.end(tag)
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip_depth:
+            self.builder.text(data)
+
+def segment_html_parser(html):
+    parser = _BlockParser()
+    parser.feed(html)
+    parser.close()
+    parser.builder.flush()
+    return parser.title or "", parser.meta_desc, parser.builder.blocks
+
+def segment_selectolax(html):
+    from selectolax.lexbor import LexborHTMLParser
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(list(SKIP_TEXT_TAGS))
+    node = tree.css_first('title')
+    title = node.text() if node is not None else ""
+    node = tree.css_first('meta[name="description"]')
+    meta_desc = (node.attributes.get('content') or '') if node is not None else ""
+    builder = _BlockBuilder()
+    body = tree.body
+    # Iterative walk; (node, True) marks leaving an element
+    pending = [(body, False)] if body is not None else []
+    while pending:
+        node, leaving = pending.pop()
+        tag = node.tag
+        if leaving:
+            builder.end(tag)
+        elif tag == '-text':
+            builder.text(node.text_content)
+        elif not tag.startswith(('-', '_', '!')): # Comments and doctype
+            builder.start(tag, _hints(node.attributes.get))
+            pending.append((node, True))
+            pending.extend((child, False) for child in reversed(list(node.iter(include_text=True))))
+    builder.flush()
+    return title, meta_desc, builder.blocks
+
+def segment_lxml(html):
+    import lxml.etree
+    import lxml.html
+    try:
+        root = lxml.html.document_fromstring(html)
+    except lxml.etree.ParserError:
+        return "", "", [] # Empty document
+    except ValueError:
+        # Unicode input with an XML encoding declaration
+        root = lxml.html.document_fromstring(html.encode('utf-8'))
+    lxml.etree.strip_elements(root, *SKIP_TEXT_TAGS, with_tail=False)
+    node = next(root.iter('title'), None)
+    title = "".join(node.itertext()) if node is not None else ""
+    node = next((meta for meta in root.iter('meta') if meta.get('name') == 'description'), None)
+    meta_desc = (node.get('content') or '') if node is not None else ""
+    builder = _BlockBuilder()
+    body = root.find('body')
+    if body is not None:
+        for event, element in lxml.etree.iterwalk(body, events=('start', 'end')):
+            if not isinstance(element.tag, str): # Comments: only the text after them counts
+                if event == 'end':
+                    builder.text(element.tail)
+            elif event == 'start':
+                builder.start(element.tag, _hints(element.get))
+                builder.text(element.text)
+            else:
+                builder.end(element.tag)
+                if element is not body:
+                    builder.text(element.tail)
+    builder.flush()
+    return title, meta_desc, builder.blocks
+
+# Same backend names as parser_backends, so configure_parser() / --parser pick the tree builder here too
+SEGMENTERS = {
+    'selectolax': segment_selectolax,
+    'lxml': segment_lxml,
+    'html.parser': segment_html_parser,
+}
+
+def segment(html, parser=None):
+    # (title, meta description, blocks in document order)
+    return SEGMENTERS[parser or parser_backends.available_backends()[0]](html)
+
+def block_hash(text):
+    return hashlib.blake2b(normalize_text(text).encode('utf-8'), digest_size=8).hexdigest()
+
+def score_block(block):
+    # None when the block is content, otherwise the reason it is dropped
+    length = len(block['text'])
+    if length <= parser_backends.MIN_TEXT_CHARS:
+        return 'short'
+    if block['boilerplate']:
+        return 'structure'
+    if block['links'] / length > MAX_LINK_DENSITY:
+        return 'links'
+    if length / (block['tags'] + 1) < MIN_TEXT_DENSITY:
+        return 'density'
+    return None
+
+def extract_main_content(html, max_chars, parser=None):
+    # Same "Title / Current Description / text" format as parser_backends, one block per line, with
+    # boilerplate removed. Depends only on the page, so cached extractions and fingerprints stay stable.
+    title, meta_desc, blocks = segment(html, parser)
+    candidates = []
+    seen = set()
+    dropped = {}
+    for block in blocks:
+        reason = score_block(block)
+        if not reason:
+            digest = block_hash(block['text'])
+            if digest in seen:
+                reason = 'duplicate' # Repeated on the same page (product cards, "read more" teasers)
+            else:
+                candidates.append(block['text'])
+                seen.add(digest)
+        if reason:
+            dropped[reason] = dropped.get(reason, 0) + len(block['text'])
+    for reason, chars in dropped.items():
+        metrics.inc("boilerplate_chars_dropped_total", chars, reason=reason)
+    text = parser_backends.join_content(title, meta_desc, candidates, max_chars)
+    metrics.inc("main_content_chars_total", len(text))
+    return text
+
+def strip_repeated(website_text, url, store):
+    # Removes the lines of an extraction that the store has seen on most pages of the site, recording the
+    # page as it goes. Applied just before prompting, so the stored extraction doesn't drift as the store learns.
+    lines = website_text.split("\n")
+    header = 0
+    while header < len(lines) and header < len(_HEADER_PREFIXES) and lines[header].startswith(_HEADER_PREFIXES):
+        header += 1
+    body = lines[header:]
+    hashes = [block_hash(line) for line in body]
+    repeated = store.learn(url, hashes)
+    if not repeated:
+        return website_text
+    kept = [line for line, digest in zip(body, hashes) if digest not in repeated]
+    metrics.inc("boilerplate_chars_dropped_total", sum(map(len, body)) - sum(map(len, kept)), reason='repeated')
+    return "\n".join(lines[:header] + kept)
+
+def summary_text(counters):
+    # How much page text main-content extraction kept out of the prompts, from metrics.registry.counters()
+    dropped = {name[name.index('"') + 1:-2]: value for name, value in counters.items() if name.startswith("boilerplate_chars_dropped_total{")}
+    # Site-wide repeats are removed from the extraction afterwards (strip_repeated)
+    kept = counters.get("main_content_chars_total", 0) - dropped.get('repeated', 0)
+    removed = sum(value for reason, value in dropped.items() if reason != 'short')
+    if not kept and not removed:
+        return ""
+    labels = {'structure': 'ナビ・フッター等', 'links': 'リンク集', 'density': '低密度', 'duplicate': 'ページ内の重複', 'repeated': 'サイト内の繰り返し'}
+    detail = " / ".join(f"{label} {dropped[reason]:,}" for reason, label in labels.items() if dropped.get(reason))
+    return f"本文抽出: {kept:,}文字をプロンプトに使用、定型部分 {removed:,}文字を除外 ({removed / (kept + removed):.0%})" + (f" [{detail}]" if detail else "")
+
+class BoilerplateStore:
+    # Per domain: how many distinct pages each text block has been seen on. Each URL is counted once,
+    # so re-fetching a page doesn't turn its own content into boilerplate.
+    def __init__(self, path, min_pages=MIN_PAGES, min_ratio=MIN_PAGE_RATIO):
+        self.path = path
+        self.min_pages = min_pages
+        self.min_ratio = min_ratio
+        self._lock = threading.Lock()
+        self._conn = sqlite_util.connect(path, synchronous="NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS boilerplate_domains (
+                domain TEXT PRIMARY KEY,
+                pages INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS boilerplate_pages (
+                domain TEXT NOT NULL,
+                url TEXT NOT NULL,
+                PRIMARY KEY (domain, url)
+            );
+            CREATE TABLE IF NOT EXISTS boilerplate_blocks (
+                domain TEXT NOT NULL,
+                block_hash TEXT NOT NULL,
+                pages INTEGER NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (domain, block_hash)
+            );
+        """)
+        self._conn.commit()
+
+    def learn(self, url, hashes):
+        # Records the page's blocks and returns the ones that are boilerplate for its domain
+        domain = urlsplit(url).hostname or ""
+        hashes = sorted(set(hashes))
+        with self._lock:
+            new_page = self._conn.execute(
+                "INSERT OR IGNORE INTO boilerplate_pages (domain, url) VALUES (?, ?)", (domain, url)
+            ).rowcount == 1
+            if new_page:
+                self._conn.execute("INSERT OR IGNORE INTO boilerplate_domains (domain, pages) VALUES (?, 0)", (domain,))
+                self._conn.execute("UPDATE boilerplate_domains SET pages = pages + 1 WHERE domain = ?", (domain,))
+                now = time.time()
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO boilerplate_blocks (domain, block_hash, pages, updated_at) VALUES (?, ?, 0, ?)",
+                    [(domain, digest, now) for digest in hashes]
+                )
+                self._conn.executemany(
+                    "UPDATE boilerplate_blocks SET pages = pages + 1, updated_at = ? WHERE domain = ? AND block_hash = ?",
+                    [(now, domain, digest) for digest in hashes]
+                )
+            self._conn.commit()
+            total = self._conn.execute("SELECT pages FROM boilerplate_domains WHERE domain = ?", (domain,)).fetchone()
+            repeated = set()
+            threshold = max(self.min_pages, self.min_ratio * (total[0] if total else 0))
+            # Chunked to stay under SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT block_hash FROM boilerplate_blocks WHERE domain = ? AND pages >= ? AND block_hash IN ({', '.join('?' * len(chunk))})",
+                    [domain, threshold] + chunk
+                ).fetchall()
+                repeated.update(row[0] for row in rows)
+        return repeated
+
+    def stats(self):
+        with self._lock:
+            domains, pages = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(pages), 0) FROM boilerplate_domains").fetchone()
+        return {"domains": domains, "pages": pages}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,93 @@
+import re
+import unicodedata
+
+import serp_width
+
+# Local checks run on every generated candidate before it is shown; only the failing ones are sent back
+# to the model (see core_logic.repair_candidates) instead of the user doing a full-context refine.
+REQUIRED_FIELDS = ('title', 'title_tag', 'description')
+DESCRIPTION_MIN_PX = 1008 # 72 full-width characters; the prompts ask for 100-120
+DUPLICATE_SIMILARITY = 0.8 # Character-bigram Jaccard between two descriptions
+
+_KEYWORD_SPLIT_RE = re.compile(r'[,、，;；\s]+')
+_IGNORED_RE = re.compile(r'[\s・･\-‐ー－_]+')
+# Katakana -> hiragana, so "リフォーム" matches "りふぉーむ" (ー is ignored entirely)
+_KANA_TABLE = {code: code - 0x60 for code in range(0x30A1, 0x30F7)}
+
+def normalize(text):
+    # NFKC folds full/half-width forms (ＳＥＯ, ｾｵ); spaces, middle dots and long vowel marks are ignored
+    text = unicodedata.normalize('NFKC', text).casefold().translate(_KANA_TABLE)
+    return _IGNORED_RE.sub('', text)
+
+def parse_keywords(target_keywords):
+    # "SEO, AI、自動化" -> ['SEO', 'AI', '自動化']
+    if not target_keywords:
+        return []
+    return [keyword for keyword in _KEYWORD_SPLIT_RE.split(target_keywords) if normalize(keyword)]
+
+def _bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+
+def similarity(a, b):
+    a, b = _bigrams(normalize(a)), _bigrams(normalize(b))
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+def validate_candidate(item, keywords, previous=()):
+    # [(code, message)] for one candidate; empty when it passes. previous: the candidates before it
+    if not isinstance(item, dict) or not all(isinstance(item.get(field), str) and item[field].strip() for field in REQUIRED_FIELDS):
+        return [("schema", "title / title_tag / description のいずれかが欠けています")]
+
+    issues = []
+    title_width = serp_width.title_width(item['title_tag'])
+    if title_width > serp_width.TITLE_MAX_PX:
+        issues.append(("title_too_long", f"タイトルタグが長すぎます（{title_width:.0f}px。{serp_width.TITLE_MAX_PX}px、全角30文字程度まで）"))
+    desc_width = serp_width.description_width(item['description'])
+    desc_lines = serp_width.description_lines(item['description'])
+    if desc_lines > serp_width.DESCRIPTION_MAX_LINES:
+        issues.append(("description_too_long", f"説明文が長すぎます（検索結果で{desc_lines}行。1行{serp_width.DESCRIPTION_LINE_PX}px、{serp_width.DESCRIPTION_MAX_LINES}行まで表示）"))
+    elif desc_width < DESCRIPTION_MIN_PX:
+        issues.append(("description_too_short", f"説明文が短すぎます（{desc_width:.0f}px。全角100〜120文字程度に）"))
+
+    text = normalize(item['title_tag'] + item['description'])
+    missing = [keyword for keyword in keywords if normalize(keyword) not in text]
+    if missing:
+        issues.append(("missing_keywords", f"必須キーワード「{'」「'.join(missing)}」が含まれていません"))
+
+    for other in previous:
+        if isinstance(other, dict) and isinstance(other.get('description'), str):
+            if similarity(item['description'], other['description']) >= DUPLICATE_SIMILARITY:
+                issues.append(("duplicate", "他の案とほぼ同じ内容です。別の訴求ポイントで書き直してください"))
+                break
+    return issues
+
+def validate_suggestions(suggestions, target_keywords):
+    # One issue list per candidate; duplicates are reported on the later one
+    keywords = parse_keywords(target_keywords)
+    return [validate_candidate(item, keywords, suggestions[:index]) for index, item in enumerate(suggestions)]
+
+def summary(counters):
+    # Pass rates from metrics.registry.counters(), and how many manual refines the repairs saved
+    pages = counters.get("pages_validated_total", 0)
+    candidates = counters.get("candidates_validated_total", 0)
+    passed = counters.get("candidates_passed_total", 0)
+    repaired = counters.get("candidates_repaired_total", 0)
+    requests = counters.get("repair_requests_total", 0)
+    return {
+        "pages": pages,
+        "candidates": candidates,
+        "first_pass_rate": passed / candidates if candidates else 0.0,
+        "final_pass_rate": (passed + repaired) / candidates if candidates else 0.0,
+        "repair_requests": requests,
+        "repair_requests_per_1000_pages": requests * 1000 / pages if pages else 0.0,
+        # Each repaired candidate is one full-context refine_description call the user no longer makes
+        "refines_saved_per_1000_pages": repaired * 1000 / pages if pages else 0.0,
+    }
+
+def summary_text(counters):
+    stats = summary(counters)
+    if not stats['candidates']:
+        return ""
+    return (
+        f"候補の検証: 初回合格率 {stats['first_pass_rate']:.1%} / 自動修正後 {stats['final_pass_rate']:.1%}"
+        f" (修正リクエスト {stats['repair_requests']}回、1000ページあたり手動修正 {stats['refines_saved_per_1000_pages']:.0f}回分を削減)"
+    )
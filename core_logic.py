@@ -1,51 +1,241 @@
-import requests
-from bs4 import BeautifulSoup
-import google.generativeai as genai
 import json
+import os
+import threading
+import time
+
+import boilerplate
+import candidate_validator
+import metrics
+import parser_backends
+import rate_limiter
+import serp_width
+
+# requests and google.generativeai are imported on first use (or by warm_up()): the Gemini SDK alone takes
+# about a second to import, which used to delay the first window
+genai = None
+genai_client = None
+_genai_lock = threading.Lock()
+
+def load_genai():
+    global genai, genai_client
+    if genai is None:
+        with _genai_lock:
+            if genai is None:
+                from google.generativeai import client
+                import google.generativeai
+                genai_client = client
+                genai = google.generativeai
+    return genai
+
+def warm_up():
+    # Imports the heavy modules ahead of the first request; the GUI runs this on a background thread
+    with metrics.span("startup.warm_up"):
+        http_session()
+        load_genai()
+        extract_website_text("<title>warm-up</title>")
 
 # AI Model Configuration
 GEMINI_MODEL_NAME = 'gemini-3-flash-preview'
 
-def fetch_website_content(url):
+# Shared by every Gemini call in the process so all callers draw from one quota
+gemini_limiter = rate_limiter.RateLimiter()
+
+def configure_rate_limits(requests_per_minute=rate_limiter.DEFAULT_REQUESTS_PER_MINUTE,
+                          tokens_per_minute=rate_limiter.DEFAULT_TOKENS_PER_MINUTE,
+                          max_concurrency=rate_limiter.DEFAULT_MAX_CONCURRENCY):
+    global gemini_limiter
+    gemini_limiter = rate_limiter.RateLimiter(requests_per_minute, tokens_per_minute, max_concurrency)
+
+# Local data (caches, history) lives next to the user's other app data
+APP_DATA_DIR = os.path.join(os.environ.get('APPDATA') or os.path.expanduser('~'), 'MetaDescriptionGenerator')
+
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# One keep-alive session for every page download in the process (fetch, streaming fetch, crawler), created on
+# first use since requests is a lazy import, and shared by all fetch threads: only the connection pool is
+# shared state, since the cookie jar rejects every cookie and each fetch starts as clean as a plain
+# requests.get. The pool keeps up to HTTP_POOL_SIZE idle connections per host, so it should match the
+# number of fetch threads.
+HTTP_POOL_SIZE = 10
+http = None
+_http_lock = threading.Lock()
+
+def configure_http(pool_size=HTTP_POOL_SIZE):
+    global HTTP_POOL_SIZE, http
+    with _http_lock:
+        HTTP_POOL_SIZE = pool_size
+        if http is not None:
+            http.close()
+        http = None
+
+def http_session():
+    global http
+    if http is None:
+        with _http_lock:
+            if http is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from http.cookiejar import DefaultCookiePolicy
+                session = requests.Session()
+                session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+                session.headers.update(REQUEST_HEADERS)
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                http = session
+    return http
+
+# Limit content length to avoid token limits (approx 10k chars)
+MAX_CONTENT_CHARS = 10000
+
+# HTML parser backend (see parser_backends); None picks the fastest one installed
+HTML_PARSER = None
+
+def configure_parser(name=None):
+    global HTML_PARSER
+    parser_backends.get_backend(name) # Fail early on an unavailable backend
+    HTML_PARSER = name
+
+def decode_html(content, content_type=None):
+    # Header charset, then <meta charset>, then detection on a prefix only
+    return parser_backends.decode_html(content, content_type)
+
+# Main-content extraction (see boilerplate): drops navigation, footers, link lists and blocks repeated
+# across a site's pages to shrink the prompt. It walks the whole tree of the selected parser backend, about
+# 6x slower than the plain extraction (still a few ms per page); False sends every h1/h2/p text instead.
+MAIN_CONTENT = True
+# BoilerplateStore learning the per-site repeated blocks; None scores each page on its own
+boilerplate_store = None
+
+def configure_extraction(main_content=True, store=None):
+    global MAIN_CONTENT, boilerplate_store
+    MAIN_CONTENT = main_content
+    boilerplate_store = store
+
+def extractor_id(main_content=None):
+    # Saved with cached extractions; a 304 only reuses text that was extracted the same way.
+    # The plain backends (and streaming_extractor) all produce the same text.
+    if MAIN_CONTENT if main_content is None else main_content:
+        return f"main-content-{boilerplate.VERSION}"
+    return "plain"
+
+def extract_website_text(html, parser=None, main_content=None):
+    # Title, current meta description and the page text, capped at MAX_CONTENT_CHARS
+    if MAIN_CONTENT if main_content is None else main_content:
+        return boilerplate.extract_main_content(html, MAX_CONTENT_CHARS, parser or HTML_PARSER)
+    return parser_backends.get_backend(parser or HTML_PARSER)(html, MAX_CONTENT_CHARS)
+
+def strip_site_boilerplate(url, website_text):
+    # Drops the blocks the store has seen on most pages of the site. Called right before prompting, so the
+    # cached extraction and the page fingerprints don't change as the store learns.
+    if boilerplate_store is None or not MAIN_CONTENT:
+        return website_text
+    return boilerplate.strip_repeated(website_text, url, boilerplate_store)
+
+def fetch_website_content(url, fetch_cache=None, extract=None, prefetched=None):
+    # extract(raw bytes, content type) -> text replaces the in-thread parse, e.g. ParsePool.extract runs it in a worker process
+    # prefetched(url) -> (raw bytes, response headers) or None hands over a body that was already downloaded (Crawler.take_body)
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        response.encoding = response.apparent_encoding
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract relevant text
-        title = soup.title.string if soup.title else ""
-        meta_desc = ""
-        meta = soup.find('meta', attrs={'name': 'description'})
-        if meta:
-            meta_desc = meta.get('content', '')
-        
-        # Get main content text (h1, h2, p)
-        content_parts = []
-        if title: content_parts.append(f"Title: {title}")
-        if meta_desc: content_parts.append(f"Current Description: {meta_desc}")
-        
-        for tag in soup.find_all(['h1', 'h2', 'p']):
-            text = tag.get_text(strip=True)
-            if len(text) > 20: # Filter out short snippets
-                content_parts.append(text)
-        
-        # Limit content length to avoid token limits (approx 10k chars)
-        full_text = "\n".join(content_parts)
-        return full_text[:10000]
+        body = prefetched(url) if prefetched else None
+        if body:
+            content, response_headers = body
+        else:
+            headers = dict(REQUEST_HEADERS)
+            cached = fetch_cache.get(url, extractor_id()) if fetch_cache else None
+            if cached:
+                headers.update(fetch_cache.conditional_headers(cached))
+
+            with metrics.span("fetch.download"):
+                response = http_session().get(url, headers=headers, timeout=10)
+            if cached and response.status_code == 304:
+                # Unchanged since the last crawl: reuse the stored extraction, no body and no parse
+                fetch_cache.record(not_modified=True)
+                metrics.inc("fetch_not_modified_total")
+                return cached['text']
+            response.raise_for_status()
+            content, response_headers = response.content, response.headers
+        content_type = response_headers.get('Content-Type')
+        if extract:
+            with metrics.span("fetch.parse"):
+                text = extract(content, content_type)
+        else:
+            with metrics.span("fetch.decode"):
+                html = decode_html(content, content_type)
+            with metrics.span("fetch.parse"):
+                text = extract_website_text(html)
+        metrics.inc("pages_fetched_total")
+        if fetch_cache:
+            fetch_cache.record(not_modified=False)
+            fetch_cache.set(url, response_headers.get('ETag'), response_headers.get('Last-Modified'), text, extractor_id())
+        return text
         
     except Exception as e:
+        metrics.inc("fetch_errors_total")
         raise Exception(f"サイトの読み込みに失敗しました: {str(e)}")
 
-def generate_descriptions(api_key, website_text, global_instruction, target_keywords, tone="SEO重視"):
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
-    
-    prompt = f"""
+# genai.configure() is process-global, so configuring and binding a transport must not interleave
+_configure_lock = threading.Lock()
+
+class GeminiClient:
+    # Created once per API key and shared across worker threads.
+    # The model handle is bound to its own transport, so later configure() calls for other keys don't affect it.
+    def __init__(self, api_key, model_name=GEMINI_MODEL_NAME, model=None):
+        self.api_key = api_key
+        self.model_name = model_name
+        if model is None:
+            load_genai()
+            with _configure_lock:
+                genai.configure(api_key=api_key)
+                model = genai.GenerativeModel(model_name)
+                model._client = genai_client.get_default_generative_client()
+        self.model = model
+
+    def generate_content(self, prompt, **kwargs):
+        # gemini.call includes waiting for the rate limiter and retries; gemini.api is each request alone
+        def request():
+            metrics.inc("gemini_requests_total")
+            try:
+                with metrics.span("gemini.api"):
+                    return self.model.generate_content(prompt, **kwargs)
+            except Exception:
+                metrics.inc("gemini_errors_total")
+                raise
+
+        with metrics.span("gemini.call"):
+            return gemini_limiter.call(request, rate_limiter.estimate_tokens(prompt))
+
+    def generate_content_stream(self, prompt, **kwargs):
+        # Chunks of a streamed response, read inside the limiter: the concurrency slot is held, and errors are
+        # classified and retried, until the last chunk. Both spans run until the stream is exhausted.
+        def request():
+            metrics.inc("gemini_requests_total")
+            try:
+                with metrics.span("gemini.api"):
+                    yield from self.model.generate_content(prompt, stream=True, **kwargs)
+            except Exception:
+                metrics.inc("gemini_errors_total")
+                raise
+
+        with metrics.span("gemini.call"):
+            yield from gemini_limiter.stream(request, rate_limiter.estimate_tokens(prompt))
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+def get_client(api_key):
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = _clients[api_key] = GeminiClient(api_key)
+        return client
+
+def _generate_content(api_key, prompt):
+    return get_client(api_key).generate_content(prompt)
+
+def build_descriptions_prompt(website_text, global_instruction, target_keywords, tone="SEO重視"):
+    return f"""
     あなたはSEOの専門家です。以下のWebサイトのテキストコンテンツを分析し、検索エンジンの結果ページ（SERP）でクリック率を高めるための魅力的なmeta descriptionを3つ提案してください。
     
     要件:
@@ -73,22 +263,389 @@ def generate_descriptions(api_key, website_text, global_instruction, target_keyw
     {target_keywords}
     """
 
-    response = model.generate_content(prompt)
-    
-    # Parse JSON response
-    text_response = response.text.strip()
+def parse_json_response(text):
+    text_response = text.strip()
     # Remove markdown code blocks if present
     if text_response.startswith("```json"):
         text_response = text_response[7:-3]
     elif text_response.startswith("```"):
         text_response = text_response[3:-3]
-        
     return json.loads(text_response)
 
-def refine_description(api_key, website_text, original_desc, global_instruction, target_keywords, refine_instruction):
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+# Candidates failing the local checks (candidate_validator) get one small repair request with just their own
+# text, the problems found and the start of the page, instead of a manual full-context refine
+AUTO_REPAIR = True
+REPAIR_CONTEXT_CHARS = 800
+
+def configure_repair(enabled=True):
+    global AUTO_REPAIR
+    AUTO_REPAIR = enabled
+
+def build_repair_prompt(failing, website_text, target_keywords, tone="SEO重視"):
+    # failing: [(candidate, [(code, message)])]
+    blocks = "\n\n".join(
+        f"=== 案{n} ===\n{json.dumps(item, ensure_ascii=False)}\n問題点:\n" + "\n".join(f"- {message}" for _, message in issues)
+        for n, (item, issues) in enumerate(failing, 1)
+    )
+    return f"""
+    あなたはSEOの専門家です。以下のタイトルタグとmeta descriptionの案には問題点があります。
+    問題点だけを直し、それ以外の内容と訴求ポイントはできるだけ変えずに書き直してください。
+
+    要件:
+    - 日本語で出力すること
+    - タイトルタグは30文字前後、Meta Descriptionは100文字〜120文字程度
+    - 必須キーワードを自然に含めること
+    - **トーン＆スタイル: {tone}**
+    - 出力は案と同じ順番・同じ件数の以下のJSON形式のみにしてください。余計なmarkdown装飾は不要です。
+
+    JSON形式:
+    [
+        {{"title": "案の特徴", "title_tag": "修正後のタイトルタグ", "description": "修正後の説明文"}}
+    ]
+
+    {blocks}
+
+    必須キーワード:
+    {target_keywords}
+
+    Webサイトのコンテンツ（冒頭のみ）:
+    {website_text[:REPAIR_CONTEXT_CHARS]}
+    """
+
+def _issue_score(issues):
+    # A candidate with missing fields is worse than any number of fixable problems
+    return sum(10 if code == "schema" else 1 for code, _ in issues)
+
+def repair_candidates(api_key, failing, website_text, target_keywords, tone="SEO重視", cache=None, others=()):
+    # Returns the failing candidates in order, each replaced by its repaired version when that has fewer problems.
+    # others: the passing candidates, so a repair can't turn into a duplicate of one. Any error keeps the originals.
+    prompt = build_repair_prompt(failing, website_text, target_keywords, tone)
+    repaired = None
+    if cache:
+        cache_key = cache.make_key(GEMINI_MODEL_NAME, 'repair_candidates', prompt)
+        repaired = cache.get(cache_key)
+    if repaired is None:
+        metrics.inc("repair_requests_total")
+        try:
+            with metrics.span("generate.repair"):
+                response = _generate_content(api_key, prompt)
+                repaired = parse_json_response(response.text)
+        except Exception:
+            metrics.inc("repair_errors_total")
+            return [item for item, _ in failing]
+        if not isinstance(repaired, list):
+            metrics.inc("repair_errors_total")
+            return [item for item, _ in failing]
+        if cache:
+            cache.set(cache_key, repaired)
+
+    keywords = candidate_validator.parse_keywords(target_keywords)
+    accepted = list(others)
+    result = []
+    for index, (item, issues) in enumerate(failing):
+        fixed = repaired[index] if index < len(repaired) else None
+        if isinstance(fixed, dict) and isinstance(item, dict) and item.get('title') and not fixed.get('title'):
+            fixed = dict(fixed, title=item['title']) # Keep the pattern label
+        if fixed is not None:
+            fixed_issues = candidate_validator.validate_candidate(fixed, keywords, accepted)
+            # A duplicate is never an improvement, however many other problems it fixes
+            if all(code != "duplicate" for code, _ in fixed_issues) and _issue_score(fixed_issues) < _issue_score(issues):
+                item = fixed
+        accepted.append(item)
+        result.append(item)
+    return result
+
+def _record_validation(first_report, final_report):
+    metrics.inc("pages_validated_total")
+    for first, final in zip(first_report, final_report):
+        metrics.inc("candidates_validated_total")
+        for code, _ in first:
+            metrics.inc("validation_issues_total", issue=code)
+        if not first:
+            metrics.inc("candidates_passed_total")
+        elif not final:
+            metrics.inc("candidates_repaired_total")
+        else:
+            metrics.inc("candidates_unrepaired_total")
+
+def check_suggestions(api_key, suggestions, website_text, target_keywords, tone="SEO重視", cache=None, report=None):
+    # Validates every candidate and, if AUTO_REPAIR, sends only the failing ones for repair.
+    # report: issue lists already computed by the caller (the streaming path validates as items arrive)
+    if report is None:
+        with metrics.span("generate.validate"):
+            report = candidate_validator.validate_suggestions(suggestions, target_keywords)
+    result = list(suggestions)
+    failing = [index for index, issues in enumerate(report) if issues]
+    if failing and AUTO_REPAIR:
+        others = [item for item, issues in zip(suggestions, report) if not issues]
+        repaired = repair_candidates(api_key, [(suggestions[index], report[index]) for index in failing],
+                                     website_text, target_keywords, tone, cache, others)
+        for index, item in zip(failing, repaired):
+            result[index] = item
+        _record_validation(report, candidate_validator.validate_suggestions(result, target_keywords))
+    else:
+        _record_validation(report, report)
+    return result
+
+def generate_descriptions(api_key, website_text, global_instruction, target_keywords, tone="SEO重視", cache=None):
+    with metrics.span("generate.prompt"):
+        prompt = build_descriptions_prompt(website_text, global_instruction, target_keywords, tone)
+
+    if cache:
+        cache_key = cache.make_key(GEMINI_MODEL_NAME, 'generate_descriptions', prompt)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    response = _generate_content(api_key, prompt)
     
+    # Parse JSON response
+    with metrics.span("generate.parse_json"):
+        suggestions = parse_json_response(response.text)
+    if isinstance(suggestions, list):
+        suggestions = check_suggestions(api_key, suggestions, website_text, target_keywords, tone, cache)
+    if _valid_suggestions(suggestions):
+        # Candidates that show in full in the SERP first
+        suggestions = serp_width.rank_candidates(suggestions)
+    if cache:
+        cache.set(cache_key, suggestions)
+    return suggestions
+
+class JsonArrayItemParser:
+    # Incremental parser for a streamed JSON array of objects: feed() text chunks as they arrive and
+    # get back every top-level object that is complete so far. Code fences or other text before the
+    # array are skipped.
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0        # bracket depth, 1 == inside the top-level array
+        self._in_string = False
+        self._escape = False
+        self._item_start = None
+        self._finished = False
+
+    def feed(self, text):
+        self._buffer += text
+        items = []
+        while self._pos < len(self._buffer) and not self._finished:
+            ch = self._buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"' and self._depth > 0:
+                self._in_string = True
+            elif ch in '[{':
+                if self._depth == 0 and ch == '[':
+                    self._depth = 1
+                elif self._depth > 0:
+                    if self._depth == 1 and ch == '{':
+                        self._item_start = self._pos
+                    self._depth += 1
+            elif ch in ']}' and self._depth > 0:
+                self._depth -= 1
+                if self._depth == 1 and ch == '}' and self._item_start is not None:
+                    items.append(json.loads(self._buffer[self._item_start:self._pos + 1]))
+                    self._item_start = None
+                elif self._depth == 0:
+                    self._finished = True
+            self._pos += 1
+        # Drop text that can no longer be part of an item
+        keep_from = self._item_start if self._item_start is not None else self._pos
+        self._buffer = self._buffer[keep_from:]
+        self._pos -= keep_from
+        if self._item_start is not None:
+            self._item_start = 0
+        return items
+
+def generate_descriptions_stream(api_key, website_text, global_instruction, target_keywords, tone="SEO重視", cache=None):
+    # Same result as generate_descriptions, but yields each suggestion as soon as its JSON object is complete
+    with metrics.span("generate.prompt"):
+        prompt = build_descriptions_prompt(website_text, global_instruction, target_keywords, tone)
+
+    if cache:
+        cache_key = cache.make_key(GEMINI_MODEL_NAME, 'generate_descriptions', prompt)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            yield from cached
+            return
+
+    response = get_client(api_key).generate_content_stream(prompt)
+    parser = JsonArrayItemParser()
+    keywords = candidate_validator.parse_keywords(target_keywords)
+    suggestions = []
+    report = []
+    full_text = []
+    # Time to the first suggestion is what the user waits for before the first card appears
+    started = time.perf_counter()
+    for chunk in response:
+        full_text.append(chunk.text)
+        for item in parser.feed(chunk.text):
+            if not suggestions:
+                metrics.observe("stage_duration_seconds", time.perf_counter() - started, stage="generate.first_item")
+            issues = candidate_validator.validate_candidate(item, keywords, suggestions)
+            suggestions.append(item)
+            report.append(issues)
+            if not issues:
+                yield item
+            # Failing candidates are held back until the repair below
+
+    if not suggestions:
+        # Not an array we could stream (unexpected format): fall back to parsing the whole response
+        suggestions = parse_json_response("".join(full_text))
+        if isinstance(suggestions, list):
+            suggestions = check_suggestions(api_key, suggestions, website_text, target_keywords, tone, cache)
+        yield from suggestions
+    else:
+        suggestions = check_suggestions(api_key, suggestions, website_text, target_keywords, tone, cache, report)
+        for index, issues in enumerate(report):
+            if issues:
+                yield suggestions[index]
+    if cache:
+        # Cards were already shown in arrival order; cache hits replay in SERP-fit order like generate_descriptions
+        if _valid_suggestions(suggestions):
+            suggestions = serp_width.rank_candidates(suggestions)
+        cache.set(cache_key, suggestions)
+
+# Multi-page batching: the fixed instruction block is sent once per request instead of once per page
+BATCH_MAX_PAGES = 10
+BATCH_MAX_PROMPT_CHARS = 60000 # Rough token budget; Japanese text is close to one token per character
+
+def build_batch_prompt(pages, global_instruction, target_keywords, tone="SEO重視"):
+    # pages: [(page_id, website_text)]
+    page_blocks = "\n\n".join(f"=== ページID: {page_id} ===\n{text}" for page_id, text in pages)
+    example_ids = ", ".join(f'"{page_id}": [...]' for page_id, _ in pages[:2])
+    return f"""
+    あなたはSEOの専門家です。以下の複数のWebページのテキストコンテンツをページごとに分析し、検索エンジンの結果ページ（SERP）でクリック率を高めるための魅力的なmeta descriptionを各ページにつき3つ提案してください。
+    
+    要件:
+    - 日本語で出力すること
+    - タイトルタグは30文字前後、Meta Descriptionは100文字〜120文字程度
+    - それぞれ異なる訴求ポイント（例：メリット強調、疑問形、要約型など）を持つこと
+    - 指定された必須キーワードを可能な限り自然に含めること
+    - 各ページの提案はそのページの内容のみに基づくこと
+    - **トーン＆スタイル: {tone}**
+    - 出力はページIDをキー、そのページの3パターンの配列を値とするJSONオブジェクトのみにしてください。余計なmarkdown装飾は不要です。
+    
+    JSON形式:
+    {{
+        "ページID": [
+            {{"title": "パターン1の特徴", "title_tag": "生成されたタイトルタグ", "description": "生成された説明文"}},
+            {{"title": "パターン2の特徴", "title_tag": "生成されたタイトルタグ", "description": "生成された説明文"}},
+            {{"title": "パターン3の特徴", "title_tag": "生成されたタイトルタグ", "description": "生成された説明文"}}
+        ]
+    }}
+    （例: {{{example_ids}}}）
+
+    サイト共通の指示:
+    {global_instruction}
+
+    必須キーワード:
+    {target_keywords}
+
+    Webページ一覧:
+    {page_blocks}
+    """
+
+def _valid_suggestions(value):
+    return (
+        isinstance(value, list) and len(value) > 0
+        and all(isinstance(item, dict) and 'description' in item for item in value)
+    )
+
+def pack_pages(pages, max_pages=BATCH_MAX_PAGES, max_chars=BATCH_MAX_PROMPT_CHARS):
+    # Greedily groups [(page_id, text)] so each group fits the page count and character budget
+    groups = []
+    group = []
+    group_chars = 0
+    for page_id, text in pages:
+        if group and (len(group) >= max_pages or group_chars + len(text) > max_chars):
+            groups.append(group)
+            group = []
+            group_chars = 0
+        group.append((page_id, text))
+        group_chars += len(text)
+    if group:
+        groups.append(group)
+    return groups
+
+def generate_descriptions_batch(api_key, pages, global_instruction, target_keywords, tone="SEO重視", cache=None,
+                                max_pages=BATCH_MAX_PAGES, max_chars=BATCH_MAX_PROMPT_CHARS):
+    # pages: {page_id: website_text}. Returns {page_id: suggestions list or Exception}.
+    # Results are cached under the same key as generate_descriptions, so either path reuses the other's work.
+    results = {}
+    remaining = []
+    for page_id, text in pages.items():
+        if cache:
+            cached = cache.get(cache.make_key(
+                GEMINI_MODEL_NAME, 'generate_descriptions',
+                build_descriptions_prompt(text, global_instruction, target_keywords, tone)
+            ))
+            if cached is not None:
+                results[page_id] = cached
+                continue
+        remaining.append((page_id, text))
+
+    for group in pack_pages(remaining, max_pages, max_chars):
+        _generate_group(api_key, group, global_instruction, target_keywords, tone, cache, results)
+    return results
+
+def _generate_group(api_key, group, global_instruction, target_keywords, tone, cache, results):
+    if len(group) == 1:
+        # Per-page fallback uses the regular single-page prompt
+        page_id, text = group[0]
+        try:
+            results[page_id] = generate_descriptions(api_key, text, global_instruction, target_keywords, tone, cache=cache)
+        except Exception as e:
+            results[page_id] = e
+        return
+
+    # Short IDs keep the prompt small and avoid the model mangling long URLs
+    short_ids = {f"p{i + 1}": (page_id, text) for i, (page_id, text) in enumerate(group)}
+    with metrics.span("generate.prompt"):
+        prompt = build_batch_prompt([(short_id, text) for short_id, (_, text) in short_ids.items()],
+                                    global_instruction, target_keywords, tone)
+    try:
+        response = _generate_content(api_key, prompt)
+        with metrics.span("generate.parse_json"):
+            parsed = parse_json_response(response.text)
+        if not isinstance(parsed, dict):
+            raise ValueError("batch response is not a JSON object")
+    except ValueError:
+        # Unparseable response: split the group and try again
+        parsed = {}
+    except Exception as e:
+        for page_id, _ in group:
+            results[page_id] = e
+        return
+
+    missing = []
+    for short_id, (page_id, text) in short_ids.items():
+        suggestions = parsed.get(short_id)
+        if _valid_suggestions(suggestions):
+            suggestions = check_suggestions(api_key, suggestions, text, target_keywords, tone, cache)
+            if _valid_suggestions(suggestions):
+                suggestions = serp_width.rank_candidates(suggestions)
+            results[page_id] = suggestions
+            if cache:
+                cache.set(cache.make_key(
+                    GEMINI_MODEL_NAME, 'generate_descriptions',
+                    build_descriptions_prompt(text, global_instruction, target_keywords, tone)
+                ), suggestions)
+        else:
+            missing.append((page_id, text))
+
+    if len(missing) == len(group):
+        half = len(group) // 2
+        _generate_group(api_key, group[:half], global_instruction, target_keywords, tone, cache, results)
+        _generate_group(api_key, group[half:], global_instruction, target_keywords, tone, cache, results)
+    elif missing:
+        _generate_group(api_key, missing, global_instruction, target_keywords, tone, cache, results)
+
+def refine_description(api_key, website_text, original_desc, global_instruction, target_keywords, refine_instruction, cache=None):
     prompt = f"""
     あなたはSEOの専門家です。
     以下のWebサイトのコンテンツと、現在提案されているmeta descriptionを元に、
@@ -116,5 +673,15 @@ def refine_description(api_key, website_text, original_desc, global_instruction,
     - **必ず元の文章を変更すること**
     """
 
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    if cache:
+        cache_key = cache.make_key(GEMINI_MODEL_NAME, 'refine_description', prompt)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    with metrics.span("refine.api"):
+        response = _generate_content(api_key, prompt)
+    refined_text = response.text.strip()
+    if cache:
+        cache.set(cache_key, refined_text)
+    return refined_text
@@ -0,0 +1,253 @@
+import gzip
+import io
+import queue
+import threading
+import time
+import urllib.robotparser
+import xml.etree.ElementTree as ET
+from collections import deque
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+import core_logic
+
+DEFAULT_MAX_URLS = 10000
+DEFAULT_MAX_DEPTH = 2
+DEFAULT_DELAY = 1.0 # seconds between requests to the same host
+DISCOVERY_AHEAD = 16 # URLs the discovery thread may get ahead of the caller; also bounds the bodies kept for take_body()
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024 # The sitemap protocol caps uncompressed sitemaps at 50MB
+
+# Tracking parameters that don't change the page content
+IGNORED_QUERY_PARAMS = ('utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content', 'gclid', 'fbclid')
+SKIPPED_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.svg', '.webp', '.pdf', '.zip', '.css', '.js', '.xml', '.gz', '.mp4', '.mp3')
+
+def normalize_url(url):
+    # Canonical form used for dedup: lower-case scheme/host, no default port, no fragment,
+    # no tracking parameters, sorted query, "/" for an empty path
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    query = "&".join(sorted(
+        pair for pair in parts.query.split('&')
+        if pair and pair.split('=', 1)[0] not in IGNORED_QUERY_PARAMS
+    ))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+class _LinkParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links = []
+        self.base = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            attrs = dict(attrs)
+            if attrs.get('href') and 'nofollow' not in (attrs.get('rel') or ''):
+                self.links.append(attrs['href'])
+        elif tag == 'base' and self.base is None:
+            self.base = dict(attrs).get('href')
+
+def extract_links(html, page_url):
+    parser = _LinkParser()
+    parser.feed(html)
+    base = urljoin(page_url, parser.base) if parser.base else page_url
+    return [urljoin(base, href) for href in parser.links]
+
+class Crawler:
+    # Discovers pages of one site from robots.txt / sitemap.xml (indexes and .gz included) and,
+    # optionally, by following same-domain links. crawl() is a generator so the caller can start
+    # fetching and generating while discovery is still running; discovery runs on its own thread.
+    # When following links, pages are downloaded once, by the crawler with its politeness delay, and handed
+    # over through take_body(). With a fetch_cache those downloads are conditional and unchanged pages
+    # are followed through the links stored last time.
+    def __init__(self, start_url, follow_links=False, max_depth=DEFAULT_MAX_DEPTH, max_urls=DEFAULT_MAX_URLS,
+                 delay=DEFAULT_DELAY, respect_robots=True, fetch_cache=None):
+        self.start_url = start_url
+        parts = urlsplit(start_url)
+        self.origin = f"{parts.scheme}://{parts.netloc}"
+        self.host = (parts.hostname or '').lower()
+        self.follow_links = follow_links
+        self.max_depth = max_depth
+        self.max_urls = max_urls
+        self.delay = delay
+        self.respect_robots = respect_robots
+        self.fetch_cache = fetch_cache
+        self.seen = set()
+        self._session = core_logic.http_session() # Shares keep-alive connections with the page fetches
+        self._robots = None
+        self._last_request = {}
+        self._bodies = {}
+        self._polite_lock = threading.Lock()
+
+    def _wait_politely(self, url):
+        # Per-host politeness delay between consecutive requests
+        host = urlsplit(url).netloc
+        with self._polite_lock:
+            wait = self._last_request.get(host, 0) + self.delay - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._last_request[host] = time.monotonic()
+
+    def _get(self, url, stream=False, headers=None):
+        self._wait_politely(url)
+        response = self._session.get(url, timeout=10, stream=stream, headers=headers)
+        response.raise_for_status()
+        return response
+
+    def _load_robots(self):
+        self._robots = urllib.robotparser.RobotFileParser()
+        try:
+            response = self._get(self.origin + "/robots.txt")
+            self._robots.parse(response.text.splitlines())
+        except Exception:
+            self._robots.parse([]) # No robots.txt: everything is allowed, no sitemaps declared
+        return self._robots.site_maps() or [self.origin + "/sitemap.xml"]
+
+    def allowed(self, url):
+        if not self.respect_robots or self._robots is None:
+            return True
+        return self._robots.can_fetch(core_logic.REQUEST_HEADERS['User-Agent'], url)
+
+    def _same_site(self, url):
+        return (urlsplit(url).hostname or '').lower() == self.host
+
+    def _accept(self, url):
+        # Returns the normalized URL if it is new, in scope and allowed; None otherwise
+        if len(self.seen) >= self.max_urls or not url.startswith(('http://', 'https://')):
+            return None
+        normalized = normalize_url(url)
+        if normalized in self.seen or not self._same_site(normalized):
+            return None
+        if urlsplit(normalized).path.lower().endswith(SKIPPED_EXTENSIONS):
+            return None
+        if not self.allowed(normalized):
+            return None
+        self.seen.add(normalized)
+        return normalized
+
+    def iter_sitemap(self, sitemap_url, visited=None):
+        # Streams page URLs out of a sitemap; follows sitemap indexes recursively
+        visited = visited if visited is not None else set()
+        if sitemap_url in visited:
+            return
+        visited.add(sitemap_url)
+        try:
+            response = self._get(sitemap_url, stream=True)
+            raw = response.raw
+            raw.decode_content = True
+            data = raw.read(MAX_SITEMAP_BYTES + 1)
+        except Exception:
+            return
+        if sitemap_url.endswith('.gz') or data[:2] == b'\x1f\x8b':
+            try:
+                data = gzip.GzipFile(fileobj=io.BytesIO(data)).read(MAX_SITEMAP_BYTES + 1)
+            except OSError:
+                return
+        child_sitemaps = []
+        try:
+            for _, elem in ET.iterparse(io.BytesIO(data[:MAX_SITEMAP_BYTES]), events=('end',)):
+                name = elem.tag.rsplit('}', 1)[-1]
+                if name in ('url', 'sitemap'):
+                    loc = next((c.text.strip() for c in elem if c.tag.rsplit('}', 1)[-1] == 'loc' and c.text), None)
+                    if loc and name == 'sitemap':
+                        child_sitemaps.append(loc)
+                    elif loc:
+                        yield loc
+                    elem.clear()
+        except ET.ParseError:
+            pass # Keep whatever was parsed before the broken part
+        for child in child_sitemaps:
+            yield from self.iter_sitemap(child, visited)
+
+    def take_body(self, url):
+        # (raw body, response headers) of a page the crawler already downloaded to follow its links, or None.
+        # Pass as prefetched= to the fetch functions so the page isn't downloaded a second time, and call it
+        # for every yielded URL that is skipped without a fetch so its body is freed.
+        return self._bodies.pop(url, None)
+
+    def _seeds(self, sitemaps):
+        start = self._accept(self.start_url)
+        if start:
+            yield start
+        for sitemap_url in sitemaps:
+            for loc in self.iter_sitemap(sitemap_url):
+                url = self._accept(loc)
+                if url:
+                    yield url
+
+    def _visit(self, url, depth, pages):
+        # A page whose links are followed is downloaded before it is yielded, and its body is kept for take_body()
+        if depth >= self.max_depth:
+            yield url
+            return
+        links = []
+        entry = self.fetch_cache.get_links(url) if self.fetch_cache else None
+        try:
+            response = self._get(url, headers=self.fetch_cache.conditional_headers(entry) if entry else None)
+            if entry and response.status_code == 304:
+                links = entry['links'] # The pipeline revalidates its own copy of the page
+            else:
+                self._bodies[url] = (response.content, response.headers)
+                if 'html' in response.headers.get('Content-Type', 'text/html'):
+                    html = core_logic.decode_html(response.content, response.headers.get('Content-Type'))
+                    links = extract_links(html, url)
+                if self.fetch_cache:
+                    self.fetch_cache.set_links(url, response.headers.get('ETag'), response.headers.get('Last-Modified'), links)
+        except Exception:
+            pass # The pipeline's own fetch reports the error
+        yield url
+        for link in links:
+            found = self._accept(link)
+            if found:
+                pages.append((found, depth + 1))
+
+    def _discover(self):
+        sitemaps = self._load_robots()
+        if not self.follow_links:
+            yield from self._seeds(sitemaps)
+            return
+        pages = deque()
+        for url in self._seeds(sitemaps):
+            yield from self._visit(url, 0, pages)
+        while pages:
+            url, depth = pages.popleft()
+            yield from self._visit(url, depth, pages)
+
+    def crawl(self):
+        # Discovery (and the downloads of followed pages) runs on a thread of its own, so the caller's
+        # scheduling loop never waits on it; the thread stops once the generator is closed
+        found = queue.Queue(maxsize=DISCOVERY_AHEAD)
+        stop = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    found.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def run():
+            try:
+                for url in self._discover():
+                    if not put(url):
+                        return
+            except Exception as e:
+                put(e)
+            put(done)
+
+        threading.Thread(target=run, daemon=True, name="crawler").start()
+        try:
+            while True:
+                item = found.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
@@ -0,0 +1,219 @@
+import csv
+import hashlib
+import threading
+import time
+from array import array
+
+import sqlite_util
+from page_fingerprints import normalize_text
+
+# Near-duplicate descriptions across a site (templated pages), found with MinHash + LSH so a query only
+# looks at descriptions sharing a bucket instead of comparing against every page.
+SHINGLE_SIZE = 3 # Character n-grams; descriptions are short and Japanese has no word boundaries
+NUM_PERM = 64
+BANDS = 16       # 16 bands x 4 rows: pairs at Jaccard 0.7 share a bucket with ~99% probability
+ROWS = NUM_PERM // BANDS
+DEFAULT_THRESHOLD = 0.7 # Estimated Jaccard similarity of the n-gram sets
+DEFAULT_LIMIT = 5 # Matches returned per description
+# Distinct candidates verified per query, most shared bands first: a template shared by thousands of pages
+# fills one bucket, and a handful of confirmed matches is enough to flag the page (the report still finds
+# the whole group)
+MAX_CANDIDATES = 200
+
+GENERATED = 'generated'
+CURRENT = 'current' # The page's existing meta description
+
+_CURRENT_PREFIX = "Current Description: "
+
+def current_description(website_text):
+    # The existing meta description, as extracted by core_logic.extract_website_text
+    for line in website_text.splitlines():
+        if line.startswith(_CURRENT_PREFIX):
+            return line[len(_CURRENT_PREFIX):].strip()
+    return ""
+
+def shingles(text):
+    text = normalize_text(text).replace(' ', '')
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+def minhash(text):
+    # One SHAKE-128 output split into NUM_PERM independent 32-bit hashes per n-gram; the signature is the
+    # column-wise minimum. Keeps the per-hash work in C (about 4x faster than NUM_PERM modular hashes).
+    rows = [array('I', hashlib.shake_128(shingle.encode('utf-8')).digest(NUM_PERM * 4)) for shingle in shingles(text)]
+    return array('I', map(min, zip(*rows)))
+
+def similarity(signature_a, signature_b):
+    # Fraction of agreeing permutations estimates the Jaccard similarity of the n-gram sets
+    return sum(1 for a, b in zip(signature_a, signature_b) if a == b) / NUM_PERM
+
+def bucket_keys(signature):
+    # One key per band; the band number is hashed in so keys from different bands never collide
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(band.to_bytes(2, 'little') + rows.tobytes(), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, 'little', signed=True)) # SQLite integers are signed 64-bit
+    return keys
+
+def _signature(blob):
+    signature = array('I')
+    signature.frombytes(blob)
+    return signature
+
+class DuplicateIndex:
+    # Generated and current descriptions of every page, with their MinHash signatures and LSH buckets.
+    # A page's descriptions of one source are replaced as a whole when it is generated again.
+    def __init__(self, path, threshold=DEFAULT_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite_util.connect(path, synchronous="NORMAL") # One commit per page
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS descriptions (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL,
+                source TEXT NOT NULL,
+                description TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS descriptions_url ON descriptions (url, source);
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                bucket INTEGER NOT NULL,
+                description_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS lsh_buckets_bucket ON lsh_buckets (bucket);
+            CREATE INDEX IF NOT EXISTS lsh_buckets_description ON lsh_buckets (description_id);
+        """)
+        self._conn.commit()
+
+    def update(self, url, descriptions, source=GENERATED):
+        descriptions = [description for description in descriptions if description and description.strip()]
+        signatures = [minhash(description) for description in descriptions]
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM lsh_buckets WHERE description_id IN (SELECT id FROM descriptions WHERE url = ? AND source = ?)",
+                (url, source)
+            )
+            self._conn.execute("DELETE FROM descriptions WHERE url = ? AND source = ?", (url, source))
+            now = time.time()
+            for description, signature in zip(descriptions, signatures):
+                cursor = self._conn.execute(
+                    "INSERT INTO descriptions (url, source, description, signature, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (url, source, description, signature.tobytes(), now)
+                )
+                self._conn.executemany(
+                    "INSERT INTO lsh_buckets (bucket, description_id) VALUES (?, ?)",
+                    [(key, cursor.lastrowid) for key in bucket_keys(signature)]
+                )
+            self._conn.commit()
+
+    def query(self, description, exclude_url=None, threshold=None, limit=DEFAULT_LIMIT):
+        # Indexed descriptions similar to this one, most similar first: [{url, source, description, similarity}]
+        threshold = self.threshold if threshold is None else threshold
+        signature = minhash(description)
+        keys = bucket_keys(signature)
+        with self._lock:
+            # Distinct candidates from other pages, those sharing the most bands first (most likely similar)
+            rows = self._conn.execute(
+                f"""SELECT d.url, d.source, d.description, d.signature FROM descriptions d JOIN (
+                    SELECT b.description_id AS id, COUNT(*) AS hits FROM lsh_buckets b
+                    JOIN descriptions o ON o.id = b.description_id
+                    WHERE b.bucket IN ({", ".join("?" * len(keys))}) AND o.url IS NOT ?
+                    GROUP BY b.description_id ORDER BY hits DESC LIMIT ?
+                ) c ON c.id = d.id""",
+                keys + [exclude_url, MAX_CANDIDATES]
+            ).fetchall()
+        matches = []
+        for url, source, text, blob in rows:
+            score = similarity(signature, _signature(blob))
+            if score >= threshold:
+                matches.append({"url": url, "source": source, "description": text, "similarity": round(score, 2)})
+        matches.sort(key=lambda match: match['similarity'], reverse=True)
+        return matches[:limit]
+
+    def check(self, url, descriptions, current=None):
+        # Indexes a page's generated (and current) descriptions and returns the other pages they resemble:
+        # [{index, url, source, description, similarity}], index being the position in descriptions
+        if current is not None:
+            self.update(url, [current], CURRENT)
+        self.update(url, descriptions, GENERATED)
+        found = []
+        for index, description in enumerate(descriptions):
+            if description and description.strip():
+                found.extend(dict(match, index=index) for match in self.query(description, exclude_url=url))
+        return found
+
+    def report(self, threshold=None):
+        # Site-wide clusters of near-identical descriptions spanning at least two pages, largest first.
+        # Each bucket is merged against its first member only, so a template shared by thousands of
+        # pages costs one comparison per page rather than one per pair.
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            buckets = self._conn.execute(
+                "SELECT GROUP_CONCAT(description_id) FROM lsh_buckets GROUP BY bucket HAVING COUNT(*) > 1"
+            ).fetchall()
+            rows = self._conn.execute("""
+                SELECT id, url, source, description, signature FROM descriptions WHERE id IN (
+                    SELECT description_id FROM lsh_buckets WHERE bucket IN (
+                        SELECT bucket FROM lsh_buckets GROUP BY bucket HAVING COUNT(*) > 1
+                    )
+                )
+            """).fetchall()
+        entries = {row[0]: row[1:4] for row in rows}
+        signatures = {row[0]: _signature(row[4]) for row in rows}
+
+        parent = {}
+        def find(node):
+            root = node
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while parent.get(node, node) != root: # Path compression
+                parent[node], node = root, parent[node]
+            return root
+
+        for (ids,) in buckets:
+            ids = [int(value) for value in ids.split(',')]
+            first = ids[0]
+            for other in ids[1:]:
+                if find(other) != find(first) and similarity(signatures[first], signatures[other]) >= threshold:
+                    parent[find(other)] = find(first)
+
+        clusters = {}
+        for node in entries:
+            clusters.setdefault(find(node), []).append(node)
+        result = []
+        for members in clusters.values():
+            urls = {entries[node][0] for node in members}
+            if len(urls) < 2:
+                continue
+            result.append({
+                "pages": len(urls),
+                "members": [
+                    {"url": url, "source": source, "description": description}
+                    for url, source, description in sorted(entries[node] for node in members)
+                ],
+            })
+        result.sort(key=lambda cluster: cluster['pages'], reverse=True)
+        return result
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM descriptions").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+REPORT_HEADER = ['グループ', 'ページ数', 'URL', '種別', '説明文']
+SOURCE_LABELS = {GENERATED: '生成', CURRENT: '現在'}
+
+def write_report(clusters, path):
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(REPORT_HEADER)
+        for number, cluster in enumerate(clusters, 1):
+            for member in cluster['members']:
+                writer.writerow([number, cluster['pages'], member['url'], SOURCE_LABELS.get(member['source'], member['source']), member['description']])
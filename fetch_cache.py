@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+
+import sqlite_util
+
+class FetchCache:
+    # Remembers ETag / Last-Modified and the extracted text per URL so re-crawls can send
+    # conditional requests and reuse the stored extraction on 304 Not Modified.
+    # Each row records how the text was extracted (core_logic.extractor_id); an entry from another
+    # extractor is a miss, so the page is fetched unconditionally and extracted again.
+    # The crawler keeps the links it found on each page in crawl_links, under its own validators, so a
+    # re-crawl can follow an unchanged page's links from a 304 instead of downloading the page.
+    def __init__(self, path):
+        self.path = path
+        self.not_modified = 0
+        self.fetched = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite_util.connect(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS fetch_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                text TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                extractor TEXT
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS crawl_links (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                links TEXT NOT NULL
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(fetch_cache)")}
+        if 'extractor' not in columns: # Created before extractions were tagged; those rows never match
+            self._conn.execute("ALTER TABLE fetch_cache ADD COLUMN extractor TEXT")
+        self._conn.commit()
+
+    def get(self, url, extractor=None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, text, extractor FROM fetch_cache WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None or row[3] != extractor:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "text": row[2]}
+
+    def set(self, url, etag, last_modified, text, extractor=None):
+        with self._lock:
+            if not etag and not last_modified:
+                # Nothing to revalidate against next time
+                self._conn.execute("DELETE FROM fetch_cache WHERE url = ?", (url,))
+            else:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO fetch_cache (url, etag, last_modified, text, fetched_at, extractor) VALUES (?, ?, ?, ?, ?, ?)",
+                    (url, etag, last_modified, text, time.time(), extractor)
+                )
+            self._conn.commit()
+
+    def get_links(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, links FROM crawl_links WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "links": json.loads(row[2])}
+
+    def set_links(self, url, etag, last_modified, links):
+        with self._lock:
+            if not etag and not last_modified:
+                self._conn.execute("DELETE FROM crawl_links WHERE url = ?", (url,))
+            else:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO crawl_links (url, etag, last_modified, links) VALUES (?, ?, ?, ?)",
+                    (url, etag, last_modified, json.dumps(links))
+                )
+            self._conn.commit()
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def record(self, not_modified):
+        with self._lock:
+            if not_modified:
+                self.not_modified += 1
+            else:
+                self.fetched += 1
+
+    def stats(self):
+        with self._lock:
+            return {"not_modified": self.not_modified, "fetched": self.fetched}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
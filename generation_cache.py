@@ -0,0 +1,107 @@
+import hashlib
+import json
+import threading
+import time
+
+import sqlite_util
+
+DEFAULT_MAX_ENTRIES = 20000
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60 # 30 days
+
+class GenerationCache:
+    # Persistent cache of Gemini results, keyed by a hash of the model name and the full prompt.
+    # Least-recently-used entries are evicted beyond max_entries; entries older than ttl_seconds are ignored.
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite_util.connect(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS generation_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_generation_cache_accessed ON generation_cache (accessed_at)")
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM generation_cache").fetchone()[0]
+
+    @staticmethod
+    def make_key(model_name, kind, prompt):
+        payload = json.dumps([model_name, kind, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM generation_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM generation_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._entries -= 1
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE generation_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM generation_cache WHERE key = ?", (key,)).fetchone()
+            if not exists:
+                self._entries += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO generation_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self._entries > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM generation_cache WHERE key IN "
+                "(SELECT key FROM generation_cache ORDER BY accessed_at ASC LIMIT ?)",
+                (self._entries - self.max_entries,)
+            )
+            self._entries = self.max_entries
+
+    def purge_expired(self):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM generation_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+            )
+            self._conn.commit()
+            self._entries = self._conn.execute("SELECT COUNT(*) FROM generation_cache").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM generation_cache")
+            self._conn.commit()
+            self._entries = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": self._entries,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,127 @@
+import argparse
+import csv
+import json
+import os
+import sys
+
+import core_logic
+from history_store import HistoryStore
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # Parquet export is optional
+    pa = None
+    pq = None
+
+CHUNK_SIZE = 5000
+FORMATS = ('csv', 'jsonl', 'parquet')
+CSV_HEADER = ['日時', 'URL', 'パターン', 'タイトルタグ', '文字数', 'メタディスクリプション', '文字数']
+COLUMNS = ['timestamp', 'url', 'pattern', 'title_tag', 'description']
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower().lstrip('.')
+    return ext if ext in FORMATS else 'csv'
+
+def _chunks(entries, size):
+    chunk = []
+    for entry in entries:
+        chunk.append(entry)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _write_csv(f, chunk, state):
+    if state.get('writer') is None:
+        state['writer'] = csv.writer(f)
+        state['writer'].writerow(CSV_HEADER)
+    for entry in chunk:
+        title = entry.get('title_tag', '')
+        desc = entry.get('description', '')
+        state['writer'].writerow([
+            entry.get('timestamp', ''),
+            entry.get('url', ''),
+            entry.get('pattern', ''),
+            title,
+            len(title),
+            desc,
+            len(desc)
+        ])
+
+def _write_jsonl(f, chunk, state):
+    for entry in chunk:
+        f.write(json.dumps({key: entry.get(key, '') for key in COLUMNS}, ensure_ascii=False) + "\n")
+
+def export_history(store, path, fmt=None, url_prefix=None, since=None, until=None,
+                   chunk_size=CHUNK_SIZE, on_progress=None):
+    # Streams matching history rows from the store to CSV / JSONL / Parquet, one chunk at a time,
+    # so memory use does not grow with the archive size. on_progress(written, total) is called per chunk
+    # and may raise to cancel; the partially written file is removed in that case.
+    fmt = fmt or detect_format(path)
+    if fmt == 'parquet' and pa is None:
+        raise Exception("Parquet形式での出力には pyarrow が必要です (pip install pyarrow)")
+
+    total = store.count(url_prefix, since, until)
+    entries = store.iter_entries(chunk_size, url_prefix, since, until)
+    part_path = path + ".part"
+    written = 0
+    try:
+        if fmt == 'parquet':
+            schema = pa.schema([(name, pa.string()) for name in COLUMNS])
+            with pq.ParquetWriter(part_path, schema) as writer:
+                for chunk in _chunks(entries, chunk_size):
+                    # One row group per chunk
+                    writer.write_table(pa.table(
+                        {name: [entry.get(name, '') for entry in chunk] for name in COLUMNS}, schema=schema
+                    ))
+                    written += len(chunk)
+                    if on_progress:
+                        on_progress(written, total)
+        else:
+            write_chunk = _write_csv if fmt == 'csv' else _write_jsonl
+            encoding = 'utf-8-sig' if fmt == 'csv' else 'utf-8'
+            state = {}
+            with open(part_path, 'w', newline='', encoding=encoding) as f:
+                if fmt == 'csv':
+                    _write_csv(f, [], state) # Header even when nothing matches
+                for chunk in _chunks(entries, chunk_size):
+                    write_chunk(f, chunk, state)
+                    written += len(chunk)
+                    if on_progress:
+                        on_progress(written, total)
+        os.replace(part_path, path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    return written
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生成履歴をCSV / JSONL / Parquetに書き出します")
+    parser.add_argument("output", help="出力ファイル (.csv / .jsonl / .parquet)")
+    parser.add_argument("--history", default=os.path.join(core_logic.APP_DATA_DIR, "history.sqlite3"), help="生成履歴データベースのパス")
+    parser.add_argument("--format", choices=FORMATS, help="出力形式 (既定: 拡張子から判定)")
+    parser.add_argument("--url-prefix", help="このURLで始まる履歴のみ")
+    parser.add_argument("--since", help="この日時以降 (例: 2026-01-01)")
+    parser.add_argument("--until", help="この日時以前 (例: 2026-01-31 23:59:59)")
+    args = parser.parse_args(argv)
+
+    def print_progress(written, total):
+        print(f"\r{written}/{total}", end="", file=sys.stderr)
+
+    written = export_history(
+        HistoryStore(args.history),
+        args.output,
+        fmt=args.format,
+        url_prefix=args.url_prefix,
+        since=args.since,
+        until=args.until,
+        on_progress=print_progress
+    )
+    print(f"\n{written}件を書き出しました: {args.output}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import datetime
+import sqlite3
+import threading
+
+import sqlite_util
+
+class HistoryStore:
+    # Append-only SQLite archive of every generated suggestion.
+    # Indexed by URL and timestamp; title tags and descriptions are full-text searchable through FTS5.
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite_util.connect(path, synchronous="NORMAL")
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS generation_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                pattern TEXT NOT NULL DEFAULT '',
+                title_tag TEXT NOT NULL DEFAULT '',
+                description TEXT NOT NULL DEFAULT ''
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_url ON generation_history (url, timestamp)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_history_timestamp ON generation_history (timestamp)")
+        self.fts_enabled = self._create_fts()
+        self._conn.commit()
+
+    def _create_fts(self):
+        # The trigram tokenizer gives substring matches for Japanese, which has no spaces between words
+        for tokenize in ("trigram", "unicode61"):
+            try:
+                self._conn.execute(f"""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS generation_history_fts USING fts5(
+                        title_tag, description,
+                        content='generation_history', content_rowid='id', tokenize='{tokenize}'
+                    )
+                """)
+                break
+            except sqlite3.OperationalError:
+                continue
+        else:
+            return False # SQLite built without FTS5; search() falls back to LIKE
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS generation_history_ai AFTER INSERT ON generation_history BEGIN
+                INSERT INTO generation_history_fts (rowid, title_tag, description)
+                VALUES (new.id, new.title_tag, new.description);
+            END
+        """)
+        self._conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS generation_history_ad AFTER DELETE ON generation_history BEGIN
+                INSERT INTO generation_history_fts (generation_history_fts, rowid, title_tag, description)
+                VALUES ('delete', old.id, old.title_tag, old.description);
+            END
+        """)
+        return True
+
+    def add_entries(self, url, suggestions, timestamp=None):
+        timestamp = timestamp or datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        rows = [
+            (url, timestamp, item.get('title', ''), item.get('title_tag', ''), item.get('description', ''))
+            for item in suggestions
+        ]
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.executemany(
+                    "INSERT INTO generation_history (url, timestamp, pattern, title_tag, description) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+            last_id = self._conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        first_id = last_id - cursor.rowcount + 1
+        return [
+            {"id": first_id + i, "url": row[0], "timestamp": row[1], "pattern": row[2], "title_tag": row[3], "description": row[4]}
+            for i, row in enumerate(rows)
+        ]
+
+    def import_entries(self, entries):
+        # One-off migration of the old client_storage list (oldest first)
+        rows = [
+            (e.get('url', ''), e.get('timestamp', ''), e.get('pattern', ''), e.get('title_tag', ''), e.get('description', ''))
+            for e in entries
+        ]
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO generation_history (url, timestamp, pattern, title_tag, description) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+        return len(rows)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params).fetchall()]
+
+    def recent(self, limit=50, before_id=None):
+        # Newest first; pass the last id of the previous page as before_id to page further back (keyset paging)
+        if before_id is None:
+            return self._query("SELECT * FROM generation_history ORDER BY id DESC LIMIT ?", (limit,))
+        return self._query(
+            "SELECT * FROM generation_history WHERE id < ? ORDER BY id DESC LIMIT ?", (before_id, limit)
+        )
+
+    def entries_for_url(self, url):
+        return self._query(
+            "SELECT * FROM generation_history WHERE url = ? ORDER BY timestamp DESC, id DESC", (url,)
+        )
+
+    def search(self, query, limit=100, before_id=None):
+        query = query.strip()
+        if not query:
+            return []
+        before_id = before_id if before_id is not None else -1
+        # Trigram FTS needs at least three characters; shorter queries use a plain scan
+        if self.fts_enabled and len(query) >= 3:
+            phrase = '"' + query.replace('"', '""') + '"'
+            return self._query(
+                "SELECT h.* FROM generation_history_fts f JOIN generation_history h ON h.id = f.rowid "
+                "WHERE generation_history_fts MATCH ? AND (? < 0 OR h.id < ?) ORDER BY h.id DESC LIMIT ?",
+                (phrase, before_id, before_id, limit)
+            )
+        pattern = f"%{query}%"
+        return self._query(
+            "SELECT * FROM generation_history WHERE (title_tag LIKE ? OR description LIKE ?) AND (? < 0 OR id < ?) "
+            "ORDER BY id DESC LIMIT ?",
+            (pattern, pattern, before_id, before_id, limit)
+        )
+
+    def _filters(self, url_prefix=None, since=None, until=None):
+        # Timestamps are "YYYY-MM-DD HH:MM:SS" strings, so range filters compare lexicographically.
+        # The URL prefix is a range condition so it can use the url index.
+        clauses = []
+        params = []
+        if url_prefix:
+            clauses.append("url >= ? AND url < ?")
+            params += [url_prefix, url_prefix + "\U0010ffff"]
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            if len(until) == 10:
+                until += " 23:59:59" # A bare date includes the whole day
+            clauses.append("timestamp <= ?")
+            params.append(until)
+        return clauses, params
+
+    def count(self, url_prefix=None, since=None, until=None):
+        clauses, params = self._filters(url_prefix, since, until)
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM generation_history{where}", params).fetchone()[0]
+
+    def iter_entries(self, chunk_size=1000, url_prefix=None, since=None, until=None):
+        # Oldest first, fetched in keyset-paginated chunks so memory stays flat
+        clauses, params = self._filters(url_prefix, since, until)
+        clauses = ["id > ?"] + clauses
+        sql = f"SELECT * FROM generation_history WHERE {' AND '.join(clauses)} ORDER BY id LIMIT ?"
+        last_id = 0
+        while True:
+            rows = self._query(sql, [last_id] + params + [chunk_size])
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1]['id']
+
+    def clear(self):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM generation_history")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
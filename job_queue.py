@@ -0,0 +1,149 @@
+import datetime
+import json
+import sqlite3
+import threading
+import time
+
+import sqlite_util
+
+PENDING = 'pending'
+FETCHED = 'fetched'
+GENERATED = 'generated'
+FAILED = 'failed'
+STATES = (PENDING, FETCHED, GENERATED, FAILED)
+
+class JobQueue:
+    # Durable per-URL state for bulk runs. Every transition is committed immediately, so a run can be
+    # resumed after a crash: generated pages are skipped and fetched pages reuse their checkpointed text.
+    # Transitions are guarded by the current state, which makes repeating one harmless.
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite_util.connect(path, synchronous="NORMAL")
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS queue_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                created_at TEXT NOT NULL,
+                input TEXT NOT NULL,
+                output_path TEXT NOT NULL,
+                options TEXT NOT NULL
+            )
+        """)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS queue_items (
+                run_id INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                timestamp TEXT,
+                website_text TEXT,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (run_id, url)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_queue_items_state ON queue_items (run_id, state)")
+        self._conn.commit()
+
+    def create_run(self, input, output_path, options):
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO queue_runs (created_at, input, output_path, options) VALUES (?, ?, ?, ?)",
+                    (datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), input, output_path,
+                     json.dumps(options, ensure_ascii=False))
+                )
+        return cursor.lastrowid
+
+    def _run_dict(self, row):
+        if row is None:
+            return None
+        run = dict(row)
+        run['options'] = json.loads(run['options'])
+        return run
+
+    def get_run(self, run_id):
+        with self._lock:
+            return self._run_dict(self._conn.execute("SELECT * FROM queue_runs WHERE id = ?", (run_id,)).fetchone())
+
+    def latest_run(self):
+        with self._lock:
+            return self._run_dict(self._conn.execute("SELECT * FROM queue_runs ORDER BY id DESC LIMIT 1").fetchone())
+
+    def runs(self, limit=20):
+        with self._lock:
+            return [self._run_dict(row) for row in self._conn.execute(
+                "SELECT * FROM queue_runs ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()]
+
+    def enqueue(self, run_id, url):
+        # Adds the URL if it is new and returns its current item (state, checkpointed text, ...)
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO queue_items (run_id, url, updated_at) VALUES (?, ?, ?)",
+                    (run_id, url, time.time())
+                )
+            row = self._conn.execute(
+                "SELECT * FROM queue_items WHERE run_id = ? AND url = ?", (run_id, url)
+            ).fetchone()
+        return dict(row)
+
+    def _update(self, sql, params):
+        with self._lock:
+            with self._conn:
+                return self._conn.execute(sql, params).rowcount > 0
+
+    def mark_fetched(self, run_id, url, timestamp, website_text):
+        return self._update(
+            "UPDATE queue_items SET state = 'fetched', timestamp = ?, website_text = ?, error = NULL, updated_at = ? "
+            "WHERE run_id = ? AND url = ? AND state IN ('pending', 'failed')",
+            (timestamp, website_text, time.time(), run_id, url)
+        )
+
+    def mark_generated(self, run_id, url, suggestions):
+        # The checkpointed text is no longer needed once the result is stored
+        return self._update(
+            "UPDATE queue_items SET state = 'generated', result = ?, website_text = NULL, error = NULL, updated_at = ? "
+            "WHERE run_id = ? AND url = ? AND state != 'generated'",
+            (json.dumps(suggestions, ensure_ascii=False), time.time(), run_id, url)
+        )
+
+    def mark_failed(self, run_id, url, error):
+        # Fetched text is kept, so a retry only repeats the generation
+        return self._update(
+            "UPDATE queue_items SET state = 'failed', error = ?, attempts = attempts + 1, updated_at = ? "
+            "WHERE run_id = ? AND url = ? AND state != 'generated'",
+            (error, time.time(), run_id, url)
+        )
+
+    def iter_unfinished(self, run_id, chunk_size=1000):
+        # URLs not yet generated, in the order they were queued (keyset-paginated on rowid)
+        last_rowid = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT rowid, url FROM queue_items WHERE run_id = ? AND state != 'generated' AND rowid > ? "
+                    "ORDER BY rowid LIMIT ?",
+                    (run_id, last_rowid, chunk_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield row['url']
+            last_rowid = rows[-1]['rowid']
+
+    def counts(self, run_id):
+        counts = dict.fromkeys(STATES, 0)
+        with self._lock:
+            for row in self._conn.execute(
+                "SELECT state, COUNT(*) FROM queue_items WHERE run_id = ? GROUP BY state", (run_id,)
+            ):
+                counts[row[0]] = row[1]
+        return counts
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
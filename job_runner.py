@@ -0,0 +1,87 @@
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+class JobCancelled(Exception):
+    pass
+
+class Job:
+    # Handle passed to a job function. Network calls cannot be interrupted mid-flight,
+    # so cancellation is cooperative: the job calls check_cancelled() between stages.
+    def __init__(self, job_id, label, on_progress):
+        self.id = job_id
+        self.label = label
+        self._on_progress = on_progress
+        self._cancel_event = threading.Event()
+        self._committed = False
+        self.future = None
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def commit(self):
+        # The result has been applied; a cancel arriving after this point has nothing left to undo
+        self._committed = True
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set() and not self._committed:
+            raise JobCancelled()
+
+    def progress(self, message):
+        self.check_cancelled()
+        if self._on_progress:
+            self._on_progress(self, message)
+
+    def sleep(self, seconds):
+        # Interruptible replacement for time.sleep inside jobs; after commit() a cancel only cuts the wait short
+        if self._cancel_event.wait(seconds):
+            self.check_cancelled()
+
+class JobManager:
+    # Runs pipelines (fetch -> generate, refine) on worker threads so UI callbacks return immediately.
+    def __init__(self, max_workers=4):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def submit(self, label, fn, *args, on_progress=None, on_done=None, on_error=None, on_cancel=None, **kwargs):
+        job = Job(next(self._ids), label, on_progress)
+
+        def run():
+            try:
+                job.check_cancelled()
+                result = fn(job, *args, **kwargs)
+                job.check_cancelled()
+                if on_done:
+                    on_done(job, result)
+            except JobCancelled:
+                if on_cancel:
+                    on_cancel(job)
+            except Exception as e:
+                if on_error:
+                    on_error(job, e)
+            finally:
+                with self._lock:
+                    self._jobs.pop(job.id, None)
+
+        with self._lock:
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(run)
+        return job
+
+    def active_jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel_all(self):
+        for job in self.active_jobs():
+            job.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self._executor.shutdown(wait=False)
@@ -1,10 +1,26 @@
-import flet as ft
 import time
+_LAUNCHED = time.perf_counter() # Start of time-to-first-frame
+import flet as ft
 import os
-import csv
+import threading
 import datetime
+import boilerplate
+import candidate_validator
 import core_logic
+import duplicate_index
+import metrics
+import serp_width
 import ui_components
+from fetch_cache import FetchCache
+from generation_cache import GenerationCache
+from history_store import HistoryStore
+from job_runner import JobCancelled, JobManager
+
+# History cards are built one page at a time as the list is scrolled
+HISTORY_PAGE_SIZE = 30
+
+# Set by benchmarks/bench_startup.py: report the first frame and exit
+STARTUP_BENCHMARK = os.environ.get("METADESC_STARTUP_BENCHMARK") == "1"
 
 def main(page: ft.Page):
     page.title = "AI Meta Description Generator"
@@ -14,6 +30,21 @@ def main(page: ft.Page):
     page.window.height = 1200
     page.window.center()
     page.scroll = None # Disable page-level scroll to fix footer
+
+    # Identical prompts (re-runs, unchanged pages) are answered from disk instead of the API
+    generation_cache = GenerationCache(os.path.join(core_logic.APP_DATA_DIR, "generation_cache.sqlite3"))
+    # Unchanged pages come back as 304 and reuse the stored extraction
+    fetch_cache = FetchCache(os.path.join(core_logic.APP_DATA_DIR, "fetch_cache.sqlite3"))
+    # Every generation is kept; the history tab only shows the newest entries
+    history_store = HistoryStore(os.path.join(core_logic.APP_DATA_DIR, "history.sqlite3"))
+    # Generated and current descriptions of every page, to flag near-duplicates across the site
+    description_index = duplicate_index.DuplicateIndex(os.path.join(core_logic.APP_DATA_DIR, "duplicates.sqlite3"))
+    # Blocks repeated across a site's pages are learned here and kept out of the prompts
+    core_logic.configure_extraction(store=boilerplate.BoilerplateStore(os.path.join(core_logic.APP_DATA_DIR, "boilerplate.sqlite3")))
+    legacy_history = page.client_storage.get("generation_history")
+    if legacy_history:
+        history_store.import_entries(legacy_history)
+        page.client_storage.remove("generation_history")
     
     # --- Menu Bar Logic ---
     def toggle_theme_mode(e):
@@ -45,46 +76,42 @@ def main(page: ft.Page):
             ),
         ))
 
-    # --- CSV Export Logic ---
+    # --- Export Logic ---
+    def export_filters():
+        return {
+            "url_prefix": (export_url_prefix_input.value or "").strip() or None,
+            "since": (export_since_input.value or "").strip() or None,
+            "until": (export_until_input.value or "").strip() or None,
+        }
+
+    def run_export(job, path, filters):
+        import history_export
+        def on_progress(written, total):
+            job.progress(f"エクスポート中... {written}/{total}件")
+
+        written = history_export.export_history(history_store, path, on_progress=on_progress, **filters)
+        show_status(f"履歴（{written}件）を保存しました: {path}")
+
     def save_csv(e: ft.FilePickerResultEvent):
         if e.path:
-            try:
-                history = page.client_storage.get("generation_history") or []
-                if not history:
-                    show_error("保存する履歴がありません")
-                    return
-
-                with open(e.path, mode='w', newline='', encoding='utf-8-sig') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(['日時', 'URL', 'パターン', 'タイトルタグ', '文字数', 'メタディスクリプション', '文字数'])
-                    
-                    for entry in history:
-                        title = entry.get('title_tag', '')
-                        desc = entry.get('description', '')
-                        writer.writerow([
-                            entry.get('timestamp', ''),
-                            entry.get('url', ''),
-                            entry.get('pattern', ''),
-                            title,
-                            len(title),
-                            desc,
-                            len(desc)
-                        ])
-                
-                show_status(f"全履歴（{len(history)}件）をCSVに保存しました: {e.path}")
-            except Exception as ex:
-                show_error(f"保存に失敗しました: {str(ex)}")
+            filters = export_filters()
+            if not history_store.count(**filters):
+                show_error("保存する履歴がありません")
+                return
+            # Large archives are streamed to disk on a worker thread
+            start_job("履歴をエクスポート中...", run_export, e.path, filters)
 
     csv_picker = ft.FilePicker(on_result=save_csv)
     page.overlay.append(csv_picker)
 
     def export_csv_click(e):
-        history = page.client_storage.get("generation_history") or []
-        if not history:
+        import history_export
+        if not history_store.count():
             show_error("保存する履歴がありません")
             return
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        csv_picker.save_file(file_name=f"meta_descriptions_{timestamp}.csv", allowed_extensions=["csv"])
+        # Format follows the chosen extension (.csv / .jsonl / .parquet)
+        csv_picker.save_file(file_name=f"meta_descriptions_{timestamp}.csv", allowed_extensions=list(history_export.FORMATS))
 
     page.appbar = ft.AppBar(
         leading=ft.Icon(ft.Icons.AUTO_AWESOME),
@@ -205,12 +232,42 @@ def main(page: ft.Page):
         )
     )
 
+    crawl_btn = ft.OutlinedButton(
+        text="サイト全体を生成",
+        icon=ft.Icons.TRAVEL_EXPLORE,
+        tooltip="robots.txt / sitemap.xml とサイト内リンクからページを集めて順に生成します"
+    )
+    crawl_max_pages_input = ft.TextField(label="最大ページ数", value="50", width=120, dense=True)
+
     status_text = ft.Text("")
     results_column = ft.Column(spacing=10, scroll=ft.ScrollMode.AUTO)
-    history_column = ft.Column(spacing=10, scroll=ft.ScrollMode.AUTO)
+    history_list = ft.ListView(spacing=10, expand=True)
+    # Export filters (empty = no filter)
+    export_url_prefix_input = ft.TextField(label="URLプレフィックス", hint_text="https://example.com/blog/", width=320, dense=True)
+    export_since_input = ft.TextField(label="開始日", hint_text="2026-01-01", width=150, dense=True)
+    export_until_input = ft.TextField(label="終了日", hint_text="2026-01-31", width=150, dense=True)
+    history_search_input = ft.TextField(
+        label="履歴を検索",
+        hint_text="タイトルタグ・説明文に含まれる語句",
+        prefix_icon=ft.Icons.SEARCH,
+        width=400,
+        dense=True,
+        border=ft.InputBorder.OUTLINE,
+        on_submit=lambda _: load_history()
+    )
     
+    # History paging state; nothing is read from the store until the history tab is first opened
+    history_lock = threading.Lock()
+    history_loaded = False
+    history_oldest_id = None
+    history_has_more = True
+    history_query = ""
+
+    # Running generations / refinements, one row each with a cancel button
+    jobs_column = ft.Column(spacing=5)
+    job_manager = JobManager(max_workers=4)
+
     # State variables
-    current_website_text = ""
     target_refine_card = None # To know which card to update
 
     # Refinement Dialog Controls
@@ -231,73 +288,78 @@ def main(page: ft.Page):
             return
         
         close_refine_dialog(None)
-        show_status("修正案を生成中...")
-        page.update()
+        card = target_refine_card
+        
+        # Get original description from the target card
+        # New Structure:
+        # 0: ListTile (Pattern Label)
+        # 1: Text("Google検索結果プレビュー")
+        # 2: Container (SERP Preview)
+        # 3: Divider
+        # 4: Text("タイトルタグ")
+        # 5: TextField (Title Tag)
+        # 6: Row (Title Actions)
+        # 7: Divider
+        # 8: Text("メタディスクリプション")
+        # 9: TextField (Meta Description)
+        # 10: Row (Desc Actions)
+        # 11: Container (Refine Button)
+        
+        # Description is at index 9
+        original_desc = card.content.content.controls[9].value
+        
+        start_job(
+            "修正案を生成中...",
+            run_refine,
+            card,
+            api_key_input.value,
+            card.data['website_text'],
+            original_desc,
+            global_instruction_input.value,
+            target_keywords_input.value,
+            refine_instruction_input.value
+        )
 
+    def run_refine(job, card, api_key, website_text, original_desc, global_inst, target_keywords, refine_instruction):
+        refined_text = core_logic.refine_description(
+            api_key,
+            website_text,
+            original_desc,
+            global_inst,
+            target_keywords,
+            refine_instruction,
+            cache=generation_cache
+        )
+        job.check_cancelled()
+        print(f"Original: {original_desc}")
+        print(f"Refined: {refined_text}")
+
+        # Update the card (Description Field at index 9)
+        card.content.content.controls[9].value = refined_text
+        
+        # Update char count (Row at index 10 -> Text at index 0), judged by SERP width like the card's own counter
+        count_text = card.content.content.controls[10].controls[0]
+        ui_components.set_width_style(count_text, refined_text, *ui_components.DESCRIPTION_LIMIT)
+        
+        # Update copy data (Row at index 10 -> CopyBtn at index 1)
+        card.content.content.controls[10].controls[1].data = refined_text
+        
+        # Update SERP Preview (Container at index 2 -> Column -> Text at index 2)
+        card.content.content.controls[2].content.controls[2].value = serp_width.truncate_description(refined_text)
+        job.commit()
+        
+        # Visual Feedback (Flash Green)
+        original_color = card.color
+        card.color = ft.Colors.GREEN_50
+        card.update()
+        
+        show_status("修正完了！")
+        
         try:
-            # Get original description from the target card
-            # New Structure:
-            # 0: ListTile (Pattern Label)
-            # 1: Text("Google検索結果プレビュー")
-            # 2: Container (SERP Preview)
-            # 3: Divider
-            # 4: Text("タイトルタグ")
-            # 5: TextField (Title Tag)
-            # 6: Row (Title Actions)
-            # 7: Divider
-            # 8: Text("メタディスクリプション")
-            # 9: TextField (Meta Description)
-            # 10: Row (Desc Actions)
-            # 11: Container (Refine Button)
-            
-            # Description is at index 9
-            original_desc = target_refine_card.content.content.controls[9].value
-            
-            refined_text = core_logic.refine_description(
-                api_key_input.value,
-                current_website_text,
-                original_desc,
-                global_instruction_input.value,
-                target_keywords_input.value,
-                refine_instruction_input.value
-            )
-            print(f"Original: {original_desc}")
-            print(f"Refined: {refined_text}")
-
-            # Update the card (Description Field at index 9)
-            target_refine_card.content.content.controls[9].value = refined_text
-            
-            # Update char count (Row at index 10 -> Text at index 0)
-            count_text = target_refine_card.content.content.controls[10].controls[0]
-            count_text.value = f"{len(refined_text)}文字"
-            
-            # Validation Logic for Refinement
-            if len(refined_text) > 120:
-                count_text.color = ft.Colors.RED
-                count_text.weight = ft.FontWeight.BOLD
-            else:
-                count_text.color = ft.Colors.GREY
-                count_text.weight = ft.FontWeight.NORMAL
-            
-            # Update copy data (Row at index 10 -> CopyBtn at index 1)
-            target_refine_card.content.content.controls[10].controls[1].data = refined_text
-            
-            # Update SERP Preview (Container at index 2 -> Column -> Text at index 2)
-            target_refine_card.content.content.controls[2].content.controls[2].value = refined_text
-            
-            # Visual Feedback (Flash Green)
-            original_color = target_refine_card.color
-            target_refine_card.color = ft.Colors.GREEN_50
-            target_refine_card.update()
-            
-            show_status("修正完了！")
-            
-            time.sleep(1.5)
-            target_refine_card.color = original_color
-            target_refine_card.update()
-
-        except Exception as ex:
-            show_error(str(ex))
+            job.sleep(1.5)
+        finally:
+            card.color = original_color
+            card.update()
 
     refine_dialog = ft.AlertDialog(
         modal=True,
@@ -326,36 +388,170 @@ def main(page: ft.Page):
         status_text.color = ft.Colors.BLUE
         status_text.update()
 
+    def show_warning(message):
+        status_text.value = message
+        status_text.color = ft.Colors.ORANGE
+        status_text.update()
+
     def copy_to_clipboard(e):
         page.set_clipboard(e.control.data)
         page.open(ft.SnackBar(content=ft.Text("コピーしました！")))
 
     def load_history():
-        history = page.client_storage.get("generation_history") or []
-        history_column.controls.clear()
-        for entry in reversed(history):
-            # entries are expected to have: url, timestamp, pattern, title_tag, description
-            card = ui_components.create_history_card(
-                entry, 
-                copy_to_clipboard
-            )
-            history_column.controls.append(card)
-        page.update()
+        # Reset the list and show the first page (newest entries, or the newest search hits)
+        nonlocal history_oldest_id, history_has_more, history_query, history_loaded
+        with history_lock:
+            history_loaded = True
+            history_query = history_search_input.value.strip() if history_search_input.value else ""
+            history_oldest_id = None
+            history_has_more = True
+            history_list.controls.clear()
+        load_more_history()
+
+    def load_more_history():
+        nonlocal history_oldest_id, history_has_more
+        with history_lock:
+            if not history_has_more:
+                return
+            if history_query:
+                entries = history_store.search(history_query, limit=HISTORY_PAGE_SIZE, before_id=history_oldest_id)
+            else:
+                entries = history_store.recent(HISTORY_PAGE_SIZE, before_id=history_oldest_id)
+            with metrics.span("ui.build_history_page"):
+                for entry in entries:
+                    # entries are expected to have: url, timestamp, pattern, title_tag, description
+                    history_list.controls.append(ui_components.create_history_card(entry, copy_to_clipboard))
+            if entries:
+                history_oldest_id = entries[-1]['id']
+            history_has_more = len(entries) == HISTORY_PAGE_SIZE
+        history_list.update()
+
+    def on_history_scroll(e):
+        # Page in the next batch shortly before the end of the list is reached
+        if e.pixels >= e.max_scroll_extent - 300:
+            load_more_history()
 
     def save_to_history(url, suggestions):
-        history = page.client_storage.get("generation_history") or []
-        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        for item in suggestions:
-            history.append({
-                "url": url,
-                "timestamp": timestamp,
-                "pattern": item['title'],
-                "title_tag": item.get('title_tag', ''),
-                "description": item['description']
-            })
-        # Limit history to 50 items
-        history = history[-50:]
-        page.client_storage.set("generation_history", history)
+        entries = history_store.add_entries(url, suggestions)
+        # Only the new cards are added on top; the rest of the list is left untouched
+        with history_lock:
+            if not history_loaded or history_query:
+                return
+            for entry in entries:
+                history_list.controls.insert(0, ui_components.create_history_card(entry, copy_to_clipboard))
+        history_list.update()
+
+    history_list.on_scroll = on_history_scroll
+
+    def clear_history(e):
+        history_store.clear()
+        load_history()
+
+    def start_job(label, fn, *args):
+        # Run a pipeline on a worker thread; each job gets its own row with a cancel button
+        def on_cancel_click(e):
+            e.control.data.cancel()
+            e.control.disabled = True
+            e.control.update()
+
+        indicator, job_status = ui_components.create_job_indicator(label, on_cancel_click)
+
+        def on_progress(job, message):
+            job_status.value = message
+            job_status.update()
+            show_status(message)
+
+        def finish(job):
+            if indicator in jobs_column.controls:
+                jobs_column.controls.remove(indicator)
+            page.update()
+
+        def on_done(job, result):
+            finish(job)
+
+        def on_error(job, ex):
+            finish(job)
+            show_error(str(ex))
+
+        def on_cancel(job):
+            finish(job)
+            show_status(f"キャンセルしました: {job.label}")
+
+        jobs_column.controls.append(indicator)
+        job = job_manager.submit(
+            label, fn, *args,
+            on_progress=on_progress, on_done=on_done, on_error=on_error, on_cancel=on_cancel
+        )
+        indicator.controls[-1].data = job # Cancel button
+        page.update()
+        return job
+
+    def run_generation(job, url, api_key, global_inst, target_keywords, tone, domain, path, prefetched=None):
+        # 1. Fetch Content
+        job.progress(f"Webサイトを解析中... {url}")
+        website_text = core_logic.fetch_website_content(url, fetch_cache=fetch_cache, prefetched=prefetched)
+        website_text = core_logic.strip_site_boilerplate(url, website_text)
+        
+        # 2. Generate with Gemini, rendering each card as soon as its suggestion is complete
+        job.progress(f"AIが説明文を生成中... {url}")
+        suggestions = []
+        for item in core_logic.generate_descriptions_stream(
+            api_key, 
+            website_text, 
+            global_inst, 
+            target_keywords,
+            tone=tone,
+            cache=generation_cache
+        ):
+            job.check_cancelled()
+            suggestions.append(item)
+
+            # 3. Display Results
+            card = ui_components.create_result_card(
+                item, 
+                domain, 
+                path, 
+                copy_to_clipboard, 
+                open_refine_dialog
+            )
+            # Refinement needs the page text this card was generated from
+            card.data = {'url': url, 'website_text': website_text}
+            results_column.controls.append(card)
+            with metrics.span("ui.render"):
+                results_column.update()
+        
+        # 4. Save to History
+        save_to_history(url, suggestions)
+
+        # 5. Compare with the other pages generated so far (templated pages tend to get near-identical text)
+        matches = description_index.check(
+            url, [item.get('description', '') for item in suggestions], duplicate_index.current_description(website_text)
+        )
+        if matches:
+            similar_urls = sorted({match['url'] for match in matches})
+            show_warning(f"生成完了！ {url}（他のページと似た説明文があります: {similar_urls[0]}" + (f" ほか{len(similar_urls) - 1}件）" if len(similar_urls) > 1 else "）"))
+            return
+
+        show_status(f"生成完了！ {url}")
+
+    def run_crawl_generation(job, start_url, api_key, global_inst, target_keywords, tone, domain, max_pages):
+        import crawler
+        # Generation starts with the first discovered URL while the crawl keeps going
+        site_crawler = crawler.Crawler(start_url, follow_links=True, max_urls=max_pages, fetch_cache=fetch_cache)
+        done = 0
+        failed = 0
+        for url in site_crawler.crawl():
+            job.check_cancelled()
+            path = url[len(domain):].lstrip('/') if url.startswith(domain) else url
+            try:
+                run_generation(job, url, api_key, global_inst, target_keywords, tone, domain, path, site_crawler.take_body)
+            except JobCancelled:
+                raise
+            except Exception as ex:
+                failed += 1
+                job.progress(f"スキップしました: {url} ({ex})")
+            done += 1
+        show_status(f"サイト全体の生成が完了しました: {done}ページ (失敗 {failed})")
 
     def generate_descriptions_click(e):
         api_key = api_key_input.value
@@ -378,50 +574,98 @@ def main(page: ft.Page):
             show_error("ドメインを入力してください")
             return
 
-        results_column.controls.clear()
-        show_status("Webサイトを解析中...")
-        generate_btn.disabled = True
-        page.update()
+        # Start a fresh result list unless other generations are still filling it
+        if not job_manager.active_jobs():
+            results_column.controls.clear()
+
+        start_job(
+            f"生成: {url}",
+            run_generation,
+            url,
+            api_key,
+            global_inst,
+            target_keywords_input.value,
+            tone_dropdown.value,
+            domain_input.value,
+            path_input.value
+        )
+
+    def crawl_site_click(e):
+        api_key = api_key_input.value
+        domain = domain_input.value.strip().rstrip('/')
+        global_inst = global_instruction_input.value
 
+        page.client_storage.set("global_instruction", global_inst)
+        page.client_storage.set("target_keywords", target_keywords_input.value)
+        page.client_storage.set("last_domain", domain)
+
+        if not api_key:
+            show_error("APIキーを入力してください")
+            return
+        if not domain:
+            show_error("ドメインを入力してください")
+            return
         try:
-            # 1. Fetch Content
-            nonlocal current_website_text
-            current_website_text = core_logic.fetch_website_content(url)
-            
-            # 2. Generate with Gemini
-            show_status("AIが説明文を生成中...")
-            suggestions = core_logic.generate_descriptions(
-                api_key, 
-                current_website_text, 
-                global_inst, 
-                target_keywords_input.value,
-                tone=tone_dropdown.value
-            )
+            max_pages = int(crawl_max_pages_input.value)
+        except (TypeError, ValueError):
+            show_error("最大ページ数は数値で入力してください")
+            return
 
-            # 3. Display Results
-            for item in suggestions:
-                card = ui_components.create_result_card(
-                    item, 
-                    domain_input.value, 
-                    path_input.value, 
-                    copy_to_clipboard, 
-                    open_refine_dialog
-                )
-                results_column.controls.append(card)
-            
-            # 4. Save to History
-            save_to_history(url, suggestions)
-            load_history()
+        if not job_manager.active_jobs():
+            results_column.controls.clear()
+
+        start_job(
+            f"サイト全体: {domain}",
+            run_crawl_generation,
+            f"{domain}/",
+            api_key,
+            global_inst,
+            target_keywords_input.value,
+            tone_dropdown.value,
+            domain,
+            max(1, max_pages)
+        )
 
-            show_status("生成完了！")
+    generate_btn.on_click = generate_descriptions_click
 
-        except Exception as ex:
-            show_error(str(ex))
-        
-        generate_btn.disabled = False
+    # --- Diagnostics ---
+    diagnostics_table_container = ft.Container()
+    diagnostics_counters_text = ft.Text("", size=12, selectable=True)
+
+    def on_tab_change(e):
+        if e.control.selected_index == 1 and not history_loaded:
+            load_history()
+        elif e.control.selected_index == 2:
+            refresh_diagnostics()
+
+    def refresh_diagnostics(e=None):
+        diagnostics_table_container.content = ui_components.create_diagnostics_table(metrics.registry.stage_summary())
+        cache_stats = generation_cache.stats()
+        fetch_stats = fetch_cache.stats()
+        limiter_stats = core_logic.gemini_limiter.stats()
+        counters = metrics.registry.counters()
+        lines = [f"{name}: {value}" for name, value in counters.items()]
+        validation = candidate_validator.summary_text(counters)
+        if validation:
+            lines.append(validation)
+        extraction = boilerplate.summary_text(counters)
+        if extraction:
+            lines.append(extraction)
+        lines.append(f"生成キャッシュ: ヒット {cache_stats['hits']} / ミス {cache_stats['misses']} (ヒット率 {cache_stats['hit_rate']:.1%})")
+        lines.append(f"取得キャッシュ: 304 {fetch_stats['not_modified']} / 再取得 {fetch_stats['fetched']}")
+        lines.append(f"API: リトライ {limiter_stats['retries']} / 429 {limiter_stats['throttled']} (同時実行上限 {limiter_stats['concurrency_limit']})")
+        diagnostics_counters_text.value = "\n".join(lines)
         page.update()
 
-    generate_btn.on_click = generate_descriptions_click
+    def export_metrics_click(e):
+        path = os.path.join(core_logic.APP_DATA_DIR, "metrics.prom")
+        metrics.registry.write_prometheus(path)
+        show_status(f"メトリクスを書き出しました: {path}")
+
+    def reset_metrics_click(e):
+        metrics.registry.reset()
+        refresh_diagnostics()
+    crawl_btn.on_click = crawl_site_click
 
     # Tabs
     tabs = ft.Tabs(
@@ -447,7 +691,12 @@ def main(page: ft.Page):
                             path_input
                         ], alignment=ft.MainAxisAlignment.START, vertical_alignment=ft.CrossAxisAlignment.CENTER),
                         tone_dropdown,
-                        generate_btn,
+                        ft.Row([
+                            generate_btn,
+                            crawl_btn,
+                            crawl_max_pages_input
+                        ], spacing=10, vertical_alignment=ft.CrossAxisAlignment.CENTER),
+                        jobs_column,
                         ft.Divider(),
                         results_column
                     ], spacing=20, scroll=ft.ScrollMode.AUTO),
@@ -460,7 +709,7 @@ def main(page: ft.Page):
                 content=ft.Container(
                     content=ft.Column([
                         ft.Row([
-                            ft.Text("最近の生成履歴 (最大50件)", size=18, weight=ft.FontWeight.BOLD),
+                            ft.Text("生成履歴", size=18, weight=ft.FontWeight.BOLD),
                             ft.Row([
                                 ft.ElevatedButton(
                                     "CSVエクスポート",
@@ -470,17 +719,46 @@ def main(page: ft.Page):
                                 ft.IconButton(
                                     icon=ft.Icons.DELETE_SWEEP, 
                                     tooltip="履歴をクリア",
-                                    on_click=lambda _: (page.client_storage.set("generation_history", []), load_history())
+                                    on_click=clear_history
                                 ),
                             ], spacing=10),
                         ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
-                        history_column
+                        history_search_input,
+                        ft.Row([
+                            ft.Text("エクスポート条件:", size=12, color=ft.Colors.BLUE_GREY),
+                            export_url_prefix_input,
+                            export_since_input,
+                            export_until_input,
+                        ], spacing=10, vertical_alignment=ft.CrossAxisAlignment.CENTER),
+                        history_list
+                    ], spacing=10, expand=True),
+                    padding=10
+                )
+            ),
+            ft.Tab(
+                text="診断",
+                icon=ft.Icons.SPEED,
+                content=ft.Container(
+                    content=ft.Column([
+                        ft.Row([
+                            ft.Text("処理時間の内訳", size=18, weight=ft.FontWeight.BOLD),
+                            ft.Row([
+                                ft.ElevatedButton("更新", icon=ft.Icons.REFRESH, on_click=refresh_diagnostics),
+                                ft.ElevatedButton("Prometheus形式で書き出す", icon=ft.Icons.SAVE, on_click=export_metrics_click),
+                                ft.IconButton(icon=ft.Icons.RESTART_ALT, tooltip="計測値をリセット", on_click=reset_metrics_click),
+                            ], spacing=10),
+                        ], alignment=ft.MainAxisAlignment.SPACE_BETWEEN),
+                        ft.Text("取得・解析・API呼び出し・画面描画の各ステージの所要時間です。同時実行数などの調整にご利用ください。", size=12, color=ft.Colors.GREY_700),
+                        diagnostics_table_container,
+                        ft.Divider(),
+                        diagnostics_counters_text,
                     ], spacing=10, scroll=ft.ScrollMode.AUTO),
                     padding=10
                 )
             ),
         ],
-        expand=1
+        expand=1,
+        on_change=on_tab_change
     )
 
     page.add(
@@ -496,7 +774,12 @@ def main(page: ft.Page):
             )
         ], expand=True)
     )
-    load_history()
+    metrics.observe("stage_duration_seconds", time.perf_counter() - _LAUNCHED, stage="startup.first_frame")
+    if STARTUP_BENCHMARK:
+        print(f"FIRST_FRAME {time.time():.6f}", flush=True)
+        os._exit(0)
+    # The Gemini SDK and the parsers are imported after the window is up, before the first click needs them
+    threading.Thread(target=core_logic.warm_up, daemon=True).start()
 
 if __name__ == "__main__":
     ft.app(target=main)
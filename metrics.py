@@ -0,0 +1,133 @@
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Histogram buckets in seconds: from a cache hit / parse up to a slow Gemini call
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RECENT_SAMPLES = 1000 # Per stage, for the percentiles shown in the diagnostics panel
+PREFIX = "metadesc_"
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))]
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+class Metrics:
+    # In-process counters and per-stage timing histograms, exported in the Prometheus text format
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {} # (name, labels) -> Histogram
+        self._counters = {}   # (name, labels) -> value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    @contextmanager
+    def span(self, stage):
+        # Times the block as one observation of stage_duration_seconds{stage=...}, even if it raises
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_duration_seconds", time.perf_counter() - start, stage=stage)
+
+    def stage_summary(self):
+        # [{stage, count, total, avg, p50, p95, p99}] sorted by total time spent
+        with self._lock:
+            items = [
+                (dict(labels).get('stage', ''), h.count, h.sum, sorted(h.recent))
+                for (name, labels), h in self._histograms.items() if name == "stage_duration_seconds"
+            ]
+        rows = [
+            {
+                "stage": stage,
+                "count": count,
+                "total": total,
+                "avg": total / count if count else 0.0,
+                "p50": _percentile(recent, 50),
+                "p95": _percentile(recent, 95),
+                "p99": _percentile(recent, 99),
+            }
+            for stage, count, total, recent in items
+        ]
+        return sorted(rows, key=lambda row: row['total'], reverse=True)
+
+    def counters(self):
+        with self._lock:
+            return {name + _label_text(labels): value for (name, labels), value in sorted(self._counters.items())}
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+            seen = set()
+            for (name, labels), value in counters:
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f"# TYPE {PREFIX}{name} counter")
+                lines.append(f"{PREFIX}{name}{_label_text(labels)} {value}")
+            for (name, labels), histogram in histograms:
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f"# TYPE {PREFIX}{name} histogram")
+                cumulative = 0
+                for bound, count in zip(list(histogram.buckets) + ["+Inf"], histogram.counts):
+                    cumulative += count
+                    lines.append(f"{PREFIX}{name}_bucket{_label_text(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{PREFIX}{name}_sum{_label_text(labels)} {histogram.sum:.6f}")
+                lines.append(f"{PREFIX}{name}_count{_label_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Atomic replace, so a node_exporter textfile collector never reads a half-written file
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        part_path = path + ".part"
+        with open(part_path, 'w', encoding='utf-8') as f:
+            f.write(self.render_prometheus())
+        os.replace(part_path, path)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+# Process-wide registry used by every module
+registry = Metrics()
+span = registry.span
+inc = registry.inc
+observe = registry.observe
@@ -0,0 +1,117 @@
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+import sqlite_util
+
+SHINGLE_SIZE = 4 # Character shingles work for Japanese, which has no spaces between words
+SIMHASH_BITS = 64
+DEFAULT_MAX_DISTANCE = 3 # Sketches this close (in differing bits) count as unchanged
+
+NEW = 'new'
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+
+_WHITESPACE = re.compile(r'\s+')
+
+def normalize_text(text):
+    # Width/case variants and whitespace reflow are not content changes
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFKC', text)).strip().lower()
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def simhash(text):
+    # 64-bit SimHash over weighted character shingles: small edits flip only a few bits
+    if len(text) <= SHINGLE_SIZE:
+        shingles = Counter([text])
+    else:
+        shingles = Counter(text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1))
+    # Tally shingle weights per (byte position, byte value) first; expanding to bits once at the end
+    # is much cheaper than touching 64 bits per shingle
+    tallies = [[0] * 256 for _ in range(SIMHASH_BITS // 8)]
+    total = 0
+    for shingle, count in shingles.items():
+        digest = hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest()
+        for position, byte in enumerate(digest):
+            tallies[position][byte] += count
+        total += count
+    value = 0
+    for position, tally in enumerate(tallies):
+        for bit in range(8):
+            mask = 1 << bit
+            ones = sum(weight for byte, weight in enumerate(tally) if byte & mask)
+            if ones * 2 > total:
+                value |= 1 << (position * 8 + bit)
+    return value
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count('1')
+
+def fingerprint(text):
+    normalized = normalize_text(text)
+    return {"hash": content_hash(normalized), "simhash": simhash(normalized)}
+
+class FingerprintStore:
+    # Per-URL fingerprint of the extracted page text from the last successful generation,
+    # used to skip pages that have not materially changed since then.
+    def __init__(self, path, max_distance=DEFAULT_MAX_DISTANCE):
+        self.path = path
+        self.max_distance = max_distance
+        self.counts = {NEW: 0, CHANGED: 0, UNCHANGED: 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite_util.connect(path)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS page_fingerprints (
+                url TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                simhash TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, url):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, simhash FROM page_fingerprints WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        # SQLite integers are signed 64-bit, so the sketch is stored as hex
+        return {"hash": row[0], "simhash": int(row[1], 16)}
+
+    def classify(self, url, text):
+        # Returns (new / changed / unchanged, fingerprint of text)
+        current = fingerprint(text)
+        previous = self.get(url)
+        if previous is None:
+            change = NEW
+        elif previous['hash'] == current['hash']:
+            change = UNCHANGED
+        elif hamming_distance(previous['simhash'], current['simhash']) <= self.max_distance:
+            change = UNCHANGED
+        else:
+            change = CHANGED
+        with self._lock:
+            self.counts[change] += 1
+        return change, current
+
+    def set(self, url, fp):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO page_fingerprints (url, content_hash, simhash, updated_at) VALUES (?, ?, ?, ?)",
+                (url, fp['hash'], format(fp['simhash'], '016x'), time.time())
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,101 @@
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from multiprocessing import shared_memory
+except ImportError: # Without shared memory the raw bytes are pickled to the workers
+    shared_memory = None
+
+import core_logic
+
+SLOT_BYTES = 2 * 1024 * 1024 # Larger pages are sent to the worker by value
+
+def extract_html_bytes(content, content_type=None, parser=None, main_content=None):
+    # Same decoding and extraction as core_logic.fetch_website_content
+    return core_logic.extract_website_text(core_logic.decode_html(content, content_type), parser, main_content=main_content)
+
+# Worker side: shared memory blocks stay attached for the life of the worker process
+_attached = {}
+
+def _extract_slot(name, size, content_type, parser, main_content):
+    block = _attached.get(name)
+    if block is None:
+        block = _attached[name] = shared_memory.SharedMemory(name=name)
+    return extract_html_bytes(bytes(block.buf[:size]), content_type, parser, main_content)
+
+class ParsePool:
+    # Runs the CPU-bound HTML extraction in worker processes so parsing scales with cores
+    # instead of contending for the GIL with the fetch threads.
+    # Raw bytes are handed over through a fixed set of shared memory slots; when every slot is busy
+    # submit() blocks, which holds back the fetch stage until the parsers catch up.
+    # parser and main_content are passed explicitly, since worker processes don't see core_logic.configure_parser()
+    # or configure_extraction().
+    def __init__(self, workers=None, slots=None, slot_bytes=SLOT_BYTES, parser=None, main_content=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.parser = parser or core_logic.HTML_PARSER
+        self.main_content = core_logic.MAIN_CONTENT if main_content is None else main_content
+        self.slot_bytes = slot_bytes
+        slots = slots or self.workers * 2
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._capacity = threading.BoundedSemaphore(slots)
+        self._free = queue.SimpleQueue()
+        self._slots = []
+        if shared_memory is not None:
+            try:
+                for _ in range(slots):
+                    block = shared_memory.SharedMemory(create=True, size=slot_bytes)
+                    self._slots.append(block)
+                    self._free.put(block)
+            except OSError:
+                pass # e.g. no /dev/shm: the slots created so far are still used
+        self.shared = 0
+        self.copied = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def submit(self, content, content_type=None):
+        # Returns a Future of the extracted text
+        self._capacity.acquire()
+        block = None
+        if len(content) <= self.slot_bytes:
+            try:
+                block = self._free.get_nowait()
+            except queue.Empty:
+                block = None
+        try:
+            if block is not None:
+                block.buf[:len(content)] = content
+                future = self._executor.submit(_extract_slot, block.name, len(content), content_type, self.parser, self.main_content)
+                self.shared += 1
+            else:
+                future = self._executor.submit(extract_html_bytes, content, content_type, self.parser, self.main_content)
+                self.copied += 1
+        except BaseException:
+            if block is not None:
+                self._free.put(block)
+            self._capacity.release()
+            raise
+
+        def release(_):
+            if block is not None:
+                self._free.put(block)
+            self._capacity.release()
+
+        future.add_done_callback(release)
+        return future
+
+    def extract(self, content, content_type=None):
+        return self.submit(content, content_type).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        for block in self._slots:
+            block.close()
+            block.unlink()
+        self._slots = []
@@ -0,0 +1,138 @@
+import codecs
+import importlib.util
+import re
+
+# The parser libraries (and chardet, via requests) are imported on first use, not at startup
+
+# Tags whose text is collected as page content
+CONTENT_TAGS = ('h1', 'h2', 'p')
+SKIP_TEXT_TAGS = ('script', 'style', 'template')
+MIN_TEXT_CHARS = 20 # Shorter snippets (buttons, labels) are dropped
+
+# Fastest first; html.parser (pure Python) is always available
+PREFERRED_BACKENDS = ('selectolax', 'lxml', 'html.parser')
+SNIFF_BYTES = 16384
+
+_CONTENT_TYPE_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?([a-zA-Z0-9_\-]+)', re.IGNORECASE)
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_\-]+)', re.IGNORECASE)
+
+def _valid_encoding(name):
+    try:
+        return codecs.lookup(name).name
+    except (LookupError, TypeError):
+        return None
+
+META_SNIFF_BYTES = 4096 # A <meta charset> is only looked for this early in the document
+
+def declared_encoding(prefix, content_type=None):
+    # The Content-Type header charset, then a <meta charset>; None when neither is usable
+    if content_type:
+        match = _CONTENT_TYPE_CHARSET_RE.search(content_type)
+        encoding = _valid_encoding(match.group(1)) if match else None
+        if encoding:
+            return encoding
+    match = _META_CHARSET_RE.search(prefix[:META_SNIFF_BYTES])
+    if match:
+        return _valid_encoding(match.group(1).decode('ascii', 'ignore'))
+    return None
+
+def detect_encoding(prefix, content_type=None):
+    # Trust the Content-Type header, then a <meta charset>, and only then run detection on the prefix
+    encoding = declared_encoding(prefix, content_type)
+    if encoding:
+        return encoding
+    from requests.compat import chardet
+    return _valid_encoding(chardet.detect(prefix[:SNIFF_BYTES])['encoding'] or 'utf-8') or 'utf-8'
+
+def decode_html(content, content_type=None):
+    return str(content, detect_encoding(content, content_type), errors='replace')
+
+def header_lines(title, meta_desc):
+    # One line each, whatever whitespace the page put inside <title> or the meta tag, so the header stays
+    # two lines that boilerplate.strip_repeated can tell apart from the body
+    lines = []
+    title = " ".join((title or "").split())
+    meta_desc = " ".join((meta_desc or "").split())
+    if title: lines.append(f"Title: {title}")
+    if meta_desc: lines.append(f"Current Description: {meta_desc}")
+    return lines
+
+def join_content(title, meta_desc, texts, max_chars):
+    content_parts = header_lines(title, meta_desc)
+    content_parts.extend(text for text in texts if len(text) > MIN_TEXT_CHARS)
+    return "\n".join(content_parts)[:max_chars]
+
+def extract_html_parser(html, max_chars):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    title = soup.title.string if soup.title else ""
+    meta_desc = ""
+    meta = soup.find('meta', attrs={'name': 'description'})
+    if meta:
+        meta_desc = meta.get('content', '')
+    texts = (tag.get_text(strip=True) for tag in soup.find_all(list(CONTENT_TAGS)))
+    return join_content(title, meta_desc, texts, max_chars)
+
+def extract_selectolax(html, max_chars):
+    from selectolax.lexbor import LexborHTMLParser
+    tree = LexborHTMLParser(html)
+    # Script/style text never counts as content (get_text skips it in the html.parser backend)
+    tree.strip_tags(list(SKIP_TEXT_TAGS))
+    node = tree.css_first('title')
+    title = node.text() if node is not None else ""
+    node = tree.css_first('meta[name="description"]')
+    meta_desc = (node.attributes.get('content') or '') if node is not None else ""
+    # Strip each text node in Python so full-width spaces are handled exactly like str.strip()
+    texts = (
+        "".join(piece.text_content.strip() for piece in tag.traverse(include_text=True) if piece.tag == '-text')
+        for tag in tree.css(", ".join(CONTENT_TAGS))
+    )
+    return join_content(title, meta_desc, texts, max_chars)
+
+def extract_lxml(html, max_chars):
+    import lxml.etree
+    import lxml.html
+    try:
+        root = lxml.html.document_fromstring(html)
+    except lxml.etree.ParserError:
+        return "" # Empty document
+    except ValueError:
+        # Unicode input with an XML encoding declaration
+        root = lxml.html.document_fromstring(html.encode('utf-8'))
+    lxml.etree.strip_elements(root, *SKIP_TEXT_TAGS, with_tail=False)
+    node = next(root.iter('title'), None)
+    title = "".join(node.itertext()) if node is not None else ""
+    node = next((meta for meta in root.iter('meta') if meta.get('name') == 'description'), None)
+    meta_desc = (node.get('content') or '') if node is not None else ""
+    texts = ("".join(piece.strip() for piece in tag.itertext()) for tag in root.iter(*CONTENT_TAGS))
+    return join_content(title, meta_desc, texts, max_chars)
+
+BACKENDS = {
+    'selectolax': extract_selectolax,
+    'lxml': extract_lxml,
+    'html.parser': extract_html_parser,
+}
+
+def _installed(module):
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ImportError: # Parent package missing
+        return False
+
+_available = None
+
+def available_backends():
+    # Checked without importing the optional backends
+    global _available
+    if _available is None:
+        installed = {'selectolax': _installed('selectolax.lexbor'), 'lxml': _installed('lxml.html'), 'html.parser': True}
+        _available = [name for name in PREFERRED_BACKENDS if installed[name]]
+    return list(_available)
+
+def get_backend(name=None):
+    # The named backend, or the fastest one installed
+    if name is None:
+        name = available_backends()[0]
+    if name not in available_backends():
+        raise Exception(f"HTMLパーサー '{name}' は利用できません (利用可能: {', '.join(available_backends())})")
+    return BACKENDS[name]
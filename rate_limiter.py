@@ -0,0 +1,189 @@
+import random
+import threading
+import time
+
+DEFAULT_REQUESTS_PER_MINUTE = 60
+DEFAULT_TOKENS_PER_MINUTE = 1000000
+DEFAULT_MAX_CONCURRENCY = 16
+
+RETRYABLE_STATUS = (429, 500, 502, 503, 504)
+RETRYABLE_NAMES = ('ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable', 'InternalServerError', 'DeadlineExceeded')
+OVERLOADED_NAMES = ('ServiceUnavailable', 'InternalServerError', 'DeadlineExceeded')
+
+# How a call ended, for AdaptiveConcurrency.release()
+SUCCEEDED = 'succeeded'
+THROTTLED = 'throttled'   # 429: halve the limit
+OVERLOADED = 'overloaded' # 5xx / server timeout: step the limit down
+FAILED = 'failed'         # Anything else (bad request, parse error): says nothing about capacity
+
+class TokenBucket:
+    # Refills continuously at rate_per_minute; acquire() blocks until `amount` tokens are available
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        # Requests larger than the bucket are clamped so they can still proceed once it is full
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(min(wait, 1.0))
+
+class AdaptiveConcurrency:
+    # AIMD: the in-flight limit grows by ~1 per window of successes, halves on throttling and steps down
+    # on server errors; other failures leave it unchanged
+    def __init__(self, initial=4, minimum=1, maximum=DEFAULT_MAX_CONCURRENCY):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(initial)
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, outcome=SUCCEEDED):
+        with self._cond:
+            self.in_flight -= 1
+            if outcome == THROTTLED:
+                self.limit = max(self.minimum, self.limit / 2)
+            elif outcome == OVERLOADED:
+                self.limit = max(self.minimum, self.limit - 1)
+            elif outcome == SUCCEEDED:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+def status_code(error):
+    code = getattr(error, 'code', None)
+    if isinstance(code, int):
+        return code
+    code = getattr(error, 'status_code', None)
+    if isinstance(code, int):
+        return code
+    return None
+
+def is_retryable(error):
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    return type(error).__name__ in RETRYABLE_NAMES
+
+def is_throttled(error):
+    return status_code(error) == 429 or type(error).__name__ in ('ResourceExhausted', 'TooManyRequests')
+
+def outcome(error):
+    if is_throttled(error):
+        return THROTTLED
+    code = status_code(error)
+    if (code is not None and code >= 500) or (code is None and type(error).__name__ in OVERLOADED_NAMES):
+        return OVERLOADED
+    return FAILED
+
+class RateLimiter:
+    # Shared by every Gemini caller: request and token budgets per minute, adaptive concurrency,
+    # and retry with jittered exponential backoff on 429 / 5xx.
+    def __init__(self, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, tokens_per_minute=DEFAULT_TOKENS_PER_MINUTE,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY, max_retries=5, base_delay=1.0, max_delay=60.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrency(initial=min(4, max_concurrency), maximum=max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.throttled = 0
+
+    def backoff(self, attempt):
+        # Full jitter keeps many workers from retrying in lockstep
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _finish(self, kind=SUCCEEDED):
+        self.concurrency.release(kind)
+        with self._stats_lock:
+            self.calls += 1
+            if kind == THROTTLED:
+                self.throttled += 1
+
+    def _acquire(self, estimated_tokens):
+        self.requests.acquire(1)
+        self.tokens.acquire(estimated_tokens)
+        self.concurrency.acquire()
+
+    def _retry(self, error, attempt):
+        # Backs off and returns True if the failed request should be sent again
+        if not is_retryable(error) or attempt >= self.max_retries:
+            return False
+        with self._stats_lock:
+            self.retries += 1
+        time.sleep(self.backoff(attempt))
+        return True
+
+    def call(self, fn, estimated_tokens=1):
+        attempt = 0
+        while True:
+            self._acquire(estimated_tokens)
+            try:
+                result = fn()
+            except Exception as e:
+                self._finish(outcome(e))
+                if not self._retry(e, attempt):
+                    raise
+                attempt += 1
+                continue
+            self._finish()
+            return result
+
+    def stream(self, fn, estimated_tokens=1):
+        # call() for a streamed response: fn() returns an iterable of chunks, and the slot is held until it is
+        # exhausted, so errors raised mid-stream adjust the limit like any other. Only a failure before the
+        # first chunk is retried; chunks already yielded can't be taken back from the caller.
+        attempt = 0
+        while True:
+            self._acquire(estimated_tokens)
+            yielded = False
+            try:
+                for chunk in fn():
+                    yielded = True
+                    yield chunk
+            except GeneratorExit:
+                self._finish(FAILED) # The caller stopped reading; says nothing about capacity
+                raise
+            except Exception as e:
+                self._finish(outcome(e))
+                if yielded or not self._retry(e, attempt):
+                    raise
+                attempt += 1
+                continue
+            self._finish()
+            return
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "throttled": self.throttled,
+                "concurrency_limit": int(self.concurrency.limit),
+            }
+
+def estimate_tokens(prompt, expected_output=1000):
+    # Rough budget: Japanese text is about one token per character
+    return len(prompt) + expected_output
@@ -0,0 +1,200 @@
+from array import array
+
+# Google truncates titles and snippets by rendered width, not by character count.
+# Advance widths of the SERP font (Arial) in font units; Arial has 2048 units per em.
+UNITS_PER_EM = 2048
+
+# Desktop SERP: titles in 20px on one line, snippets in 14px wrapped onto at most two lines
+TITLE_FONT_PX = 20
+DESCRIPTION_FONT_PX = 14
+TITLE_MAX_PX = 600          # About 30 full-width characters
+DESCRIPTION_LINE_PX = 920   # Width of the snippet column, about 65 full-width characters per line
+DESCRIPTION_MAX_LINES = 2
+# Capacity of both lines; a text this wide can still need a third line once words wrap
+DESCRIPTION_MAX_PX = DESCRIPTION_LINE_PX * DESCRIPTION_MAX_LINES
+ELLIPSIS = "…"
+
+# Never start a line (kinsoku): closing brackets and punctuation stay with the preceding character
+NO_LINE_START = frozenset("、。，．,.!?！？:;：；)]}）］｝〕〉》」』】〙〗ゝゞーぁぃぅぇぉっゃゅょゎァィゥェォッャュョヮヵヶ・…‥")
+
+# Printable ASCII (0x20-0x7E)
+_ASCII_WIDTHS = (
+    569, 569, 727, 1139, 1139, 1821, 1366, 391, 682, 682, 797, 1196, 569, 682, 569, 569,     # space - /
+    1139, 1139, 1139, 1139, 1139, 1139, 1139, 1139, 1139, 1139,                              # 0 - 9
+    569, 569, 1196, 1196, 1196, 1139, 2079,                                                  # : - @
+    1366, 1366, 1479, 1479, 1366, 1251, 1593, 1479, 569, 1024, 1366, 1139, 1706,             # A - M
+    1479, 1593, 1366, 1593, 1479, 1366, 1251, 1479, 1366, 1933, 1366, 1366, 1251,            # N - Z
+    569, 569, 569, 961, 1139, 682,                                                           # [ - `
+    1139, 1139, 1024, 1139, 1139, 569, 1139, 1139, 455, 455, 1024, 455, 1706,                # a - m
+    1139, 1139, 1139, 1139, 682, 1024, 569, 1139, 1024, 1479, 1024, 1024, 1024,              # n - z
+    684, 532, 684, 1196,                                                                     # { - ~
+)
+
+# (first, last, width) for everything outside ASCII; later ranges override earlier ones
+_RANGES = (
+    (0x00A0, 0x00A0, 569),   # no-break space
+    (0x00A1, 0x00BF, 1139),  # Latin-1 punctuation and signs (approximate)
+    (0x00C0, 0x00C5, 1366), (0x00C6, 0x00C6, 2048), (0x00C7, 0x00C7, 1479), (0x00C8, 0x00CB, 1366),
+    (0x00CC, 0x00CF, 569), (0x00D0, 0x00D1, 1479), (0x00D2, 0x00D6, 1593), (0x00D7, 0x00D7, 1196),
+    (0x00D8, 0x00D8, 1593), (0x00D9, 0x00DC, 1479), (0x00DD, 0x00DE, 1366), (0x00DF, 0x00DF, 1251),
+    (0x00E0, 0x00E5, 1139), (0x00E6, 0x00E6, 1821), (0x00E7, 0x00E7, 1024), (0x00E8, 0x00EB, 1139),
+    (0x00EC, 0x00EF, 569), (0x00F0, 0x00F6, 1139), (0x00F7, 0x00F7, 1124), (0x00F8, 0x00F8, 1251),
+    (0x00F9, 0x00FC, 1139), (0x00FD, 0x00FD, 1024), (0x00FE, 0x00FE, 1139), (0x00FF, 0x00FF, 1024),
+    (0x0300, 0x036F, 0),     # combining marks
+    (0x200B, 0x200F, 0),     # zero-width space and direction marks
+    (0x2010, 0x2013, 1139), (0x2014, 0x2015, 2048), (0x2018, 0x201B, 455), (0x201C, 0x201F, 682),
+    (0x2022, 0x2022, 717), (0x2026, 0x2026, 2048), (0x2039, 0x203A, 682),
+    (0x2E80, 0x2FDF, 2048),  # CJK radicals
+    (0x3000, 0x30FF, 2048),  # CJK punctuation, hiragana, katakana
+    (0x3100, 0x33FF, 2048),  # bopomofo, hangul jamo, CJK compatibility
+    (0x3400, 0x4DBF, 2048),  # CJK extension A
+    (0x4E00, 0x9FFF, 2048),  # CJK unified ideographs
+    (0xAC00, 0xD7A3, 2048),  # hangul syllables
+    (0xF900, 0xFAFF, 2048),  # CJK compatibility ideographs
+    (0xFE30, 0xFE4F, 2048),  # CJK compatibility forms
+    (0xFF01, 0xFF60, 2048),  # full-width ASCII
+    (0xFF61, 0xFF9F, 1024),  # half-width katakana
+    (0xFFE0, 0xFFE6, 2048),  # full-width signs
+)
+DEFAULT_WIDTH = 1139     # Unlisted BMP characters: an average Latin glyph
+WIDE_WIDTH = 2048        # Outside the BMP (emoji, CJK extension B+)
+
+def _build_table():
+    # One unsigned short per BMP code point (128KB), so measuring is a plain index per character
+    table = array('H', [DEFAULT_WIDTH]) * 0x10000
+    for code in range(0x20):
+        table[code] = 0
+    table[0x20:0x7F] = array('H', _ASCII_WIDTHS)
+    for first, last, width in _RANGES:
+        table[first:last + 1] = array('H', [width]) * (last - first + 1)
+    return table
+
+WIDTHS = _build_table()
+_lookup = WIDTHS.__getitem__
+
+def char_units(char):
+    code = ord(char)
+    return WIDTHS[code] if code < 0x10000 else WIDE_WIDTH
+
+def text_units(text):
+    # Total advance width in font units
+    try:
+        return sum(map(_lookup, map(ord, text)))
+    except IndexError: # A character outside the BMP
+        return sum(map(char_units, text))
+
+def text_width(text, font_px):
+    return text_units(text) * font_px / UNITS_PER_EM
+
+def _max_units(max_px, font_px):
+    return max_px * UNITS_PER_EM / font_px
+
+def truncation_index(text, max_px, font_px, ellipsis=ELLIPSIS):
+    # Number of characters shown before the ellipsis, or len(text) when the text fits
+    limit = _max_units(max_px, font_px)
+    if text_units(text) <= limit:
+        return len(text)
+    limit -= text_units(ellipsis)
+    running = 0
+    for index, char in enumerate(text):
+        running += char_units(char)
+        if running > limit:
+            return index
+    return len(text)
+
+def _wide(char):
+    # CJK text can wrap between any two characters; Latin text only at spaces
+    return ord(char) >= 0x2E80
+
+def wrap_lines(text, line_px, font_px):
+    # [(start, end)] character ranges of each rendered line, breaking greedily at spaces or next to
+    # CJK characters, and mid-word only when a word is longer than the line
+    limit = _max_units(line_px, font_px)
+    lines = []
+    start = 0
+    width = 0
+    last_break = None # Index a new line could start at
+    for index, char in enumerate(text):
+        if index > start and (text[index - 1] == ' ' or
+                              ((_wide(char) or _wide(text[index - 1])) and char not in NO_LINE_START)):
+            last_break = index
+        units = char_units(char)
+        if char != ' ' and width + units > limit and index > start: # Spaces may hang past the edge
+            cut = last_break if last_break is not None and last_break > start else index
+            lines.append((start, cut))
+            start = cut
+            width = text_units(text[start:index])
+            last_break = None
+        width += units
+    if start < len(text) or not lines:
+        lines.append((start, len(text)))
+    return lines
+
+def fits(text, max_px, font_px, max_lines=1):
+    units = text_units(text)
+    limit = _max_units(max_px, font_px)
+    if units <= limit:
+        return True
+    if max_lines == 1 or units > limit * max_lines:
+        return False # Wrapping only ever wastes space at line ends
+    return len(wrap_lines(text, max_px, font_px)) <= max_lines
+
+def truncate(text, max_px, font_px, ellipsis=ELLIPSIS, max_lines=1):
+    # The text as the SERP would show it; with several lines only the last one is cut
+    if max_lines == 1:
+        index = truncation_index(text, max_px, font_px, ellipsis)
+        return text if index == len(text) else text[:index].rstrip() + ellipsis
+    lines = wrap_lines(text, max_px, font_px)
+    if len(lines) <= max_lines:
+        return text
+    # The text from the last shown line on is wider than one line (that's why it wrapped), so it is cut there
+    start = lines[max_lines - 1][0]
+    index = truncation_index(text[start:], max_px, font_px, ellipsis)
+    return text[:start + index].rstrip() + ellipsis
+
+def title_width(text):
+    return text_width(text, TITLE_FONT_PX)
+
+def description_width(text):
+    return text_width(text, DESCRIPTION_FONT_PX)
+
+def description_lines(text):
+    return len(wrap_lines(text, DESCRIPTION_LINE_PX, DESCRIPTION_FONT_PX))
+
+def title_fits(text):
+    return fits(text, TITLE_MAX_PX, TITLE_FONT_PX)
+
+def description_fits(text):
+    return fits(text, DESCRIPTION_LINE_PX, DESCRIPTION_FONT_PX, DESCRIPTION_MAX_LINES)
+
+def truncate_title(text):
+    return truncate(text, TITLE_MAX_PX, TITLE_FONT_PX)
+
+def truncate_description(text):
+    return truncate(text, DESCRIPTION_LINE_PX, DESCRIPTION_FONT_PX, max_lines=DESCRIPTION_MAX_LINES)
+
+def overflow_px(item):
+    # How far a suggestion's title tag and description run past the SERP limits, in pixels
+    # (for the description: the width of the text that doesn't make it onto the two lines)
+    over_title = max(0.0, title_width(item.get('title_tag', '')) - TITLE_MAX_PX)
+    description = item.get('description', '')
+    lines = wrap_lines(description, DESCRIPTION_LINE_PX, DESCRIPTION_FONT_PX)
+    over_desc = description_width(description[lines[DESCRIPTION_MAX_LINES - 1][1]:]) if len(lines) > DESCRIPTION_MAX_LINES else 0.0
+    return over_title, over_desc
+
+def rank_candidates(suggestions):
+    # Suggestions that show in full come first; the model's order is kept otherwise (stable sort)
+    def key(item):
+        over_title, over_desc = overflow_px(item)
+        return (over_title > 0) + (over_desc > 0), over_title + over_desc
+    return sorted(suggestions, key=key)
+
+def usage_label(text, max_px, font_px, max_lines=1):
+    # Counter text for the result cards, e.g. "28文字 / 560px (93%)" or "118文字 / 2行 (87%)"
+    if max_lines == 1:
+        width = text_width(text, font_px)
+        return f"{len(text)}文字 / {width:.0f}px ({width / max_px:.0%})"
+    lines = wrap_lines(text, max_px, font_px)
+    start, end = lines[-1]
+    used = ((len(lines) - 1) * max_px + text_width(text[start:end], font_px)) / (max_lines * max_px)
+    return f"{len(text)}文字 / {len(lines)}行 ({used:.0%})"
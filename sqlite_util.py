@@ -0,0 +1,15 @@
+import os
+import sqlite3
+
+def connect(path, synchronous=None):
+    # Connection for a local store: the directory is created on first use, the one connection is shared by
+    # the store's threads (each store serializes access with its own lock), and WAL lets readers run
+    # alongside the writer. synchronous="NORMAL" for stores that commit often; WAL keeps that crash-safe.
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    if synchronous:
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+    return conn
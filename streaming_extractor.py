@@ -0,0 +1,208 @@
+import codecs
+from html.parser import HTMLParser
+
+import core_logic
+import metrics
+import parser_backends
+
+CHUNK_SIZE = 16384
+
+# Tags whose text is collected as page content (same sets as the parser_backends extraction)
+CONTENT_TAGS = parser_backends.CONTENT_TAGS
+SKIP_TEXT_TAGS = parser_backends.SKIP_TEXT_TAGS
+
+# Header charset, then <meta charset>, then detection on the first chunk
+sniff_encoding = parser_backends.detect_encoding
+
+class StreamingExtractor(HTMLParser):
+    # Incremental version of core_logic.extract_website_text without main-content extraction (the boilerplate
+    # scoring needs the whole page).
+    # Text is collected while tags arrive; `done` flips once the head is over and enough content is complete.
+    def __init__(self, max_chars=core_logic.MAX_CONTENT_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.title = None
+        self.meta_desc = ""
+        self._meta_seen = False
+        self._in_title = False
+        self._skip_depth = 0
+        self._head_done = False
+        self._open = []     # [(tag, slot index)] of content tags still open
+        self._slots = []    # content text per tag in start-tag order, None while still open
+        self._pieces = {}   # slot index -> collected strings
+        self._complete = 0  # number of leading slots that are finished
+        self._text_buf = [] # raw text since the last markup event (chunks may split a string)
+        self._chars = 0     # joined length of the finished prefix
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag == 'title' and self.title is None:
+            self._in_title = True
+            self.title = ""
+        elif tag == 'meta' and not self._meta_seen:
+            attrs = dict(attrs)
+            if attrs.get('name') == 'description':
+                self._meta_seen = True
+                self.meta_desc = attrs.get('content') or ''
+        elif tag in SKIP_TEXT_TAGS:
+            self._skip_depth += 1
+        elif tag == 'body':
+            self._head_done = True
+        if tag in CONTENT_TAGS:
+            self._head_done = True
+            self._open.append((tag, len(self._slots)))
+            self._pieces[len(self._slots)] = []
+            self._slots.append(None)
+
+    def handle_startendtag(self, tag, attrs):
+        # Void element (<meta ... />); never opens a content or skip scope
+        if tag == 'meta':
+            self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        if tag == 'title':
+            self._in_title = False
+        elif tag == 'head':
+            self._head_done = True
+        elif tag in SKIP_TEXT_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        if tag in CONTENT_TAGS:
+            for i in range(len(self._open) - 1, -1, -1):
+                if self._open[i][0] == tag:
+                    self._finish(self._open.pop(i)[1])
+                    break
+            self._advance()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        if not self._skip_depth and self._open:
+            self._text_buf.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def _flush_text(self):
+        if not self._text_buf:
+            return
+        piece = "".join(self._text_buf).strip()
+        self._text_buf = []
+        if piece:
+            # Nested content tags each see the text, like get_text() on every find_all() match
+            for _, slot in self._open:
+                self._pieces[slot].append(piece)
+
+    def _finish(self, slot):
+        self._slots[slot] = "".join(self._pieces.pop(slot))
+
+    def _advance(self):
+        while self._complete < len(self._slots) and self._slots[self._complete] is not None:
+            text = self._slots[self._complete]
+            if len(text) > 20:
+                self._chars += len(text) + 1
+            self._complete += 1
+        if self._head_done and self._header_chars() + self._chars >= self.max_chars:
+            self.done = True
+
+    def _header_chars(self):
+        chars = 0
+        if self.title:
+            chars += len(self.title) + 8
+        if self.meta_desc:
+            chars += len(self.meta_desc) + 22
+        return chars
+
+    def close(self):
+        super().close()
+        self._flush_text()
+        for _, slot in self._open:
+            self._finish(slot)
+        self._open = []
+        self._advance()
+
+    def text(self):
+        content_parts = parser_backends.header_lines(self.title, self.meta_desc)
+        for text in self._slots[:self._complete]:
+            if len(text) > 20:
+                content_parts.append(text)
+        return "\n".join(content_parts)[:self.max_chars]
+
+def extract_streaming(chunks, content_type=None, max_chars=core_logic.MAX_CONTENT_CHARS):
+    # Returns (text, bytes_consumed); stops pulling chunks as soon as the extractor is satisfied
+    extractor = StreamingExtractor(max_chars)
+    decoder = None
+    # Chunks are held back until the encoding is settled: a declared charset, or else enough bytes
+    # (SNIFF_BYTES, or the whole body) for detection to see the same sample as decode_html
+    pending = b''
+    consumed = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        consumed += len(chunk)
+        if decoder is None:
+            pending += chunk
+            declared = parser_backends.declared_encoding(pending, content_type)
+            if declared is None and len(pending) < parser_backends.SNIFF_BYTES:
+                continue
+            decoder = codecs.getincrementaldecoder(declared or sniff_encoding(pending, content_type))(errors='replace')
+            chunk, pending = pending, b''
+        extractor.feed(decoder.decode(chunk))
+        if extractor.done:
+            break
+    else:
+        if decoder is None and pending:
+            decoder = codecs.getincrementaldecoder(sniff_encoding(pending, content_type))(errors='replace')
+            extractor.feed(decoder.decode(pending))
+        if decoder is not None:
+            extractor.feed(decoder.decode(b'', final=True))
+    extractor.close()
+    return extractor.text(), consumed
+
+def fetch_website_content_streaming(url, fetch_cache=None, chunk_size=CHUNK_SIZE, prefetched=None):
+    # Drop-in alternative to core_logic.fetch_website_content that stops reading the socket early
+    text, _ = fetch_streaming_with_stats(url, fetch_cache, chunk_size, prefetched)
+    return text
+
+def fetch_streaming_with_stats(url, fetch_cache=None, chunk_size=CHUNK_SIZE, prefetched=None):
+    try:
+        body = prefetched(url) if prefetched else None
+        if body:
+            # Already downloaded in full (Crawler.take_body), so there is no socket left to stop early
+            content, response_headers = body
+            with metrics.span("fetch.stream_extract"):
+                text, _ = extract_streaming([content], response_headers.get('Content-Type'))
+            if fetch_cache:
+                fetch_cache.record(not_modified=False)
+                fetch_cache.set(url, response_headers.get('ETag'), response_headers.get('Last-Modified'), text, core_logic.extractor_id(main_content=False))
+            metrics.inc("pages_fetched_total")
+            return text, len(content)
+        headers = dict(core_logic.REQUEST_HEADERS)
+        cached = fetch_cache.get(url, core_logic.extractor_id(main_content=False)) if fetch_cache else None
+        if cached:
+            headers.update(fetch_cache.conditional_headers(cached))
+
+        with metrics.span("fetch.download"):
+            response = core_logic.http_session().get(url, headers=headers, timeout=10, stream=True)
+        with response:
+            if cached and response.status_code == 304:
+                fetch_cache.record(not_modified=True)
+                metrics.inc("fetch_not_modified_total")
+                return cached['text'], response.raw.tell()
+            response.raise_for_status()
+            # Reading and parsing are interleaved here, so they are timed together
+            with metrics.span("fetch.stream_extract"):
+                text, _ = extract_streaming(
+                    response.iter_content(chunk_size=chunk_size),
+                    response.headers.get('Content-Type')
+                )
+            if fetch_cache:
+                fetch_cache.record(not_modified=False)
+                fetch_cache.set(url, response.headers.get('ETag'), response.headers.get('Last-Modified'), text, core_logic.extractor_id(main_content=False))
+            metrics.inc("pages_fetched_total")
+            # Bytes actually pulled off the wire (before decompression)
+            return text, response.raw.tell()
+    except Exception as e:
+        metrics.inc("fetch_errors_total")
+        raise Exception(f"サイトの読み込みに失敗しました: {str(e)}")
@@ -0,0 +1,46 @@
+import json
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import candidate_validator
+import core_logic
+
+KEYWORDS = "リフォーム"
+PASSING = {
+    "title": "実績訴求",
+    "title_tag": "リフォームなら山田工務店｜創業50年の施工実績",
+    "description": "創業50年の山田工務店が、キッチン・浴室・外壁までご自宅のリフォームをまとめてお引き受けします。"
+                   "地域密着で施工事例は3000件以上、現地調査とお見積りは無料です。まずはお気軽にご相談ください。",
+}
+FAILING = {"title": "価格訴求", "title_tag": "山田工務店", "description": "安くて早い工事です。"}
+REWRITTEN = {
+    "title": "価格訴求",
+    "title_tag": "低価格リフォーム｜山田工務店",
+    "description": "水まわりのリフォームを適正価格で。山田工務店は自社職人による直接施工で中間マージンをなくし、"
+                   "工期も短く抑えています。費用の内訳を明記したお見積りで、追加料金の心配もありません。",
+}
+
+class RepairCandidatesTest(unittest.TestCase):
+    def repair(self, reply):
+        issues = candidate_validator.validate_candidate(FAILING, candidate_validator.parse_keywords(KEYWORDS))
+        self.assertEqual({code for code, _ in issues}, {"description_too_short", "missing_keywords"})
+        response = mock.Mock(text=json.dumps([reply], ensure_ascii=False))
+        with mock.patch.object(core_logic, "_generate_content", return_value=response):
+            return core_logic.repair_candidates("key", [(FAILING, issues)], "本文", KEYWORDS, others=[PASSING])
+
+    def test_passing_candidate_is_valid(self):
+        self.assertEqual(candidate_validator.validate_candidate(PASSING, candidate_validator.parse_keywords(KEYWORDS)), [])
+
+    def test_copy_of_a_passing_candidate_is_rejected(self):
+        # Fewer issues (only "duplicate") than the original, but a duplicate is never accepted as a fix
+        self.assertEqual(self.repair(dict(PASSING, title="価格訴求")), [FAILING])
+
+    def test_distinct_repair_is_accepted(self):
+        self.assertEqual(self.repair(REWRITTEN), [REWRITTEN])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,14 @@
+import time
+
 import flet as ft
 
+import metrics
+import serp_width
+
 def create_serp_preview(domain, path, title, description):
     preview_title = ft.Text(
-        value=title,
-        size=20,
+        value=serp_width.truncate_title(title),
+        size=serp_width.TITLE_FONT_PX,
         color="#1a0dab",
         weight=ft.FontWeight.NORMAL,
         font_family="Arial, sans-serif",
@@ -19,12 +24,10 @@ def create_serp_preview(domain, path, title, description):
         overflow=ft.TextOverflow.ELLIPSIS
     )
     preview_desc = ft.Text(
-        value=description,
-        size=14,
+        value=serp_width.truncate_description(description),
+        size=serp_width.DESCRIPTION_FONT_PX,
         color="#4d5156",
         font_family="Arial, sans-serif",
-        max_lines=2,
-        overflow=ft.TextOverflow.ELLIPSIS
     )
     
     container = ft.Container(
@@ -56,6 +59,21 @@ def create_serp_preview(domain, path, title, description):
     
     return container, preview_title, preview_desc
 
+def create_job_indicator(label, on_cancel):
+    # One row per running background job: spinner, latest progress message and a cancel button
+    status = ft.Text(label, size=12, color=ft.Colors.BLUE_GREY, expand=True, max_lines=1, overflow=ft.TextOverflow.ELLIPSIS)
+    row = ft.Row([
+        ft.ProgressRing(width=16, height=16, stroke_width=2),
+        status,
+        ft.IconButton(
+            icon=ft.Icons.CANCEL,
+            tooltip="キャンセル",
+            icon_size=18,
+            on_click=on_cancel
+        ),
+    ], spacing=10, vertical_alignment=ft.CrossAxisAlignment.CENTER)
+    return row, status
+
 def create_history_card(entry, on_copy):
     # entry keys: url, timestamp, pattern, title_tag, description
     return ft.Card(
@@ -89,30 +107,39 @@ def create_history_card(entry, on_copy):
         )
     )
 
+# (line px, font px, lines) of the SERP area each field is shown in
+TITLE_LIMIT = (serp_width.TITLE_MAX_PX, serp_width.TITLE_FONT_PX, 1)
+DESCRIPTION_LIMIT = (serp_width.DESCRIPTION_LINE_PX, serp_width.DESCRIPTION_FONT_PX, serp_width.DESCRIPTION_MAX_LINES)
+
+def set_width_style(count_control, text, max_px, font_px, max_lines=1):
+    # Character count and SERP width; red once the text would be cut off
+    count_control.value = serp_width.usage_label(text, max_px, font_px, max_lines)
+    if serp_width.fits(text, max_px, font_px, max_lines):
+        count_control.color = ft.Colors.GREY
+        count_control.weight = ft.FontWeight.NORMAL
+    else:
+        count_control.color = ft.Colors.RED
+        count_control.weight = ft.FontWeight.BOLD
+
 def create_result_card(item, domain, path, on_copy, open_refine_dialog):
+    started = time.perf_counter()
     # SERP Preview
     serp_preview, preview_title, preview_desc = create_serp_preview(
         domain, path, item.get('title_tag', ''), item['description']
     )
 
     def update_preview_title(e):
-        preview_title.value = e.control.value
+        preview_title.value = serp_width.truncate_title(e.control.value)
         preview_title.update()
     
     def update_preview_desc(e):
-        preview_desc.value = e.control.value
+        preview_desc.value = serp_width.truncate_description(e.control.value)
         preview_desc.update()
 
     # --- Validation Logic ---
+    # Judged by rendered width in the SERP, not character count (full-width, half-width kana and ASCII differ)
     def validate_count(text, limit, count_control):
-        count = len(text)
-        count_control.value = f"{count}文字"
-        if count > limit:
-            count_control.color = ft.Colors.RED
-            count_control.weight = ft.FontWeight.BOLD
-        else:
-            count_control.color = ft.Colors.GREY
-            count_control.weight = ft.FontWeight.NORMAL
+        set_width_style(count_control, text, *limit)
         count_control.update()
 
     # Manual Edit Logic
@@ -130,7 +157,7 @@ def create_result_card(item, domain, path, on_copy, open_refine_dialog):
             copy_btn = e.control.parent.controls[1]
             
             # Update count with validation
-            limit = e.control.data.get('limit', 120)
+            limit = e.control.data.get('limit', DESCRIPTION_LIMIT)
             validate_count(text_field.value, limit, count_text)
             
             copy_btn.data = text_field.value
@@ -149,16 +176,12 @@ def create_result_card(item, domain, path, on_copy, open_refine_dialog):
     # --- Title Tag Controls ---
     title_tag_val = item.get('title_tag', '')
     
-    # Pre-calculate initial style
-    title_len = len(title_tag_val)
-    title_color = ft.Colors.RED if title_len > 32 else ft.Colors.GREY
-    title_weight = ft.FontWeight.BOLD if title_len > 32 else ft.FontWeight.NORMAL
-    
-    title_count_text = ft.Text(f"{title_len}文字", size=12, color=title_color, weight=title_weight)
+    title_count_text = ft.Text(size=12)
+    set_width_style(title_count_text, title_tag_val, *TITLE_LIMIT)
 
     def on_title_change(e):
         update_preview_title(e)
-        validate_count(e.control.value, 32, title_count_text)
+        validate_count(e.control.value, TITLE_LIMIT, title_count_text)
 
     title_field = ft.TextField(
         value=title_tag_val,
@@ -172,7 +195,7 @@ def create_result_card(item, domain, path, on_copy, open_refine_dialog):
     title_edit_btn = ft.IconButton(
         icon=ft.Icons.EDIT,
         tooltip="手動修正",
-        data={'field': title_field, 'limit': 32},
+        data={'field': title_field, 'limit': TITLE_LIMIT},
         on_click=toggle_edit
     )
     title_actions = ft.Row(
@@ -192,16 +215,12 @@ def create_result_card(item, domain, path, on_copy, open_refine_dialog):
     # --- Description Controls ---
     desc_val = item['description']
     
-    # Pre-calculate initial style
-    desc_len = len(desc_val)
-    desc_color = ft.Colors.RED if desc_len > 120 else ft.Colors.GREY
-    desc_weight = ft.FontWeight.BOLD if desc_len > 120 else ft.FontWeight.NORMAL
-    
-    desc_count_text = ft.Text(f"{desc_len}文字", size=12, color=desc_color, weight=desc_weight)
+    desc_count_text = ft.Text(size=12)
+    set_width_style(desc_count_text, desc_val, *DESCRIPTION_LIMIT)
 
     def on_desc_change(e):
         update_preview_desc(e)
-        validate_count(e.control.value, 120, desc_count_text)
+        validate_count(e.control.value, DESCRIPTION_LIMIT, desc_count_text)
 
     desc_field = ft.TextField(
         value=desc_val,
@@ -215,7 +234,7 @@ def create_result_card(item, domain, path, on_copy, open_refine_dialog):
     desc_edit_btn = ft.IconButton(
         icon=ft.Icons.EDIT,
         tooltip="手動修正",
-        data={'field': desc_field, 'limit': 120},
+        data={'field': desc_field, 'limit': DESCRIPTION_LIMIT},
         on_click=toggle_edit
     )
     desc_actions = ft.Row(
@@ -264,4 +283,35 @@ def create_result_card(item, domain, path, on_copy, open_refine_dialog):
     )
     # Set the card as data for the refine button (last control)
     card.content.content.controls[-1].content.data = card
+    metrics.observe("stage_duration_seconds", time.perf_counter() - started, stage="ui.build_card")
     return card
+
+def create_diagnostics_table(stage_rows):
+    # stage_rows: metrics.Metrics.stage_summary() (seconds)
+    def ms(seconds):
+        return ft.DataCell(ft.Text(f"{seconds * 1000:,.1f}"))
+
+    return ft.DataTable(
+        columns=[
+            ft.DataColumn(ft.Text("ステージ")),
+            ft.DataColumn(ft.Text("回数"), numeric=True),
+            ft.DataColumn(ft.Text("合計 (秒)"), numeric=True),
+            ft.DataColumn(ft.Text("平均 (ms)"), numeric=True),
+            ft.DataColumn(ft.Text("p50 (ms)"), numeric=True),
+            ft.DataColumn(ft.Text("p95 (ms)"), numeric=True),
+            ft.DataColumn(ft.Text("p99 (ms)"), numeric=True),
+        ],
+        rows=[
+            ft.DataRow(cells=[
+                ft.DataCell(ft.Text(row['stage'])),
+                ft.DataCell(ft.Text(str(row['count']))),
+                ft.DataCell(ft.Text(f"{row['total']:,.2f}")),
+                ms(row['avg']),
+                ms(row['p50']),
+                ms(row['p95']),
+                ms(row['p99']),
+            ])
+            for row in stage_rows
+        ],
+        column_spacing=24,
+    )